@@ -0,0 +1,917 @@
+"""
+The document generators as they were before the list-and-join builder (user-012),
+copied verbatim for benchmarks/bench_document_builder.py. data is the output of
+info.prepare_questions.
+"""
+
+def generate_questions_only_html(data, test_title, syllabus_html=""):
+    """Generate HTML with only questions and options (no correct answers marked). data comes from prepare_questions."""
+    html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>{test_title}</title>
+<style>
+    * {{
+        margin: 0;
+        padding: 0;
+        box-sizing: border-box;
+    }}
+    
+    body {{
+        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+        background-color: #ffffff;
+        color: #333333;
+        padding: 20px;
+        line-height: 1.6;
+        max-width: 1200px;
+        margin: 0 auto;
+        position: relative;
+    }}
+    
+    .header {{
+        text-align: center;
+        background: linear-gradient(135deg, #e8f5e8, #f0f9f0);
+        color: #2d5a2d;
+        padding: 30px;
+        border-radius: 12px;
+        margin-bottom: 30px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.08);
+        border: 2px solid #c3e6c3;
+        position: relative;
+        z-index: 2;
+    }}
+    
+    .header h1 {{
+        font-size: 32px;
+        font-weight: bold;
+    }}
+    
+    /* --- SYLLABUS BOX STYLES (REQUIRED FOR ALL) --- */
+    .syllabus-container {{
+        border: 2px solid #ced4da;
+        border-radius: 12px;
+        padding: 20px;
+        margin-bottom: 30px;
+        background-color: #f8f9fa;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
+        page-break-inside: avoid;
+    }}
+    
+    .syllabus-header h2 {{
+        font-size: 24px;
+        color: #2196f3;
+        border-bottom: 3px solid #2196f3;
+        padding-bottom: 10px;
+        margin-bottom: 20px;
+        text-align: left;
+        font-weight: 600;
+        display: flex;
+        align-items: center;
+        gap: 10px;
+    }}
+    
+    .syllabus-content {{
+        display: block;
+        width: 100%;
+        background-color: #ffffff;
+        padding: 20px;
+        border-radius: 8px;
+        border: 1px solid #e0e0e0;
+    }}
+    
+    .subject-line {{
+        margin-bottom: 15px;
+        font-size: 16px;
+        line-height: 1.6;
+    }}
+    
+    .subject-name {{
+        font-weight: bold;
+        color: #2d5a2d;
+        display: inline-block;
+        min-width: 80px;
+    }}
+    
+    .subject-topics {{
+        color: #424242;
+        margin-left: 10px;
+    }}
+    /* --- END SYLLABUS BOX STYLES --- */
+    
+    .question-container {{
+        background-color: #ffffff;
+        border: 2px solid #e9ecef;
+        border-radius: 12px;
+        padding: 25px;
+        margin-bottom: 30px;
+        page-break-inside: avoid;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+        position: relative;
+        z-index: 2;
+    }}
+    
+    .question-watermark {{
+        position: absolute;
+        top: 15px;
+        right: 20px;
+        background: linear-gradient(135deg, rgba(173, 216, 230, 0.2), rgba(144, 238, 144, 0.2));
+        padding: 8px 16px;
+        border-radius: 20px;
+        border: 2px solid rgba(102, 205, 170, 0.4);
+        backdrop-filter: blur(10px);
+        font-size: 14px;
+        font-weight: bold;
+        color: rgba(72, 139, 139, 0.9);
+        z-index: 3;
+        pointer-events: auto;
+        user-select: none;
+        white-space: nowrap;
+        letter-spacing: 1px;
+        box-shadow: 0 2px 8px rgba(102, 205, 170, 0.2);
+        text-decoration: none;
+        transition: all 0.3s ease;
+    }}
+    
+    .question-watermark:hover {{
+        background: linear-gradient(135deg, rgba(173, 216, 230, 0.35), rgba(144, 238, 144, 0.35));
+        border-color: rgba(102, 205, 170, 0.6);
+        color: rgba(72, 139, 139, 1);
+        transform: scale(1.05);
+    }}
+    
+    .question-header {{
+        display: flex;
+        align-items: center;
+        margin-bottom: 20px;
+    }}
+    
+    .question-number {{
+        background: linear-gradient(135deg, #66cdaa, #48a999);
+        color: white;
+        min-width: 120px;
+        height: 40px;
+        border-radius: 20px;
+        display: inline-flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 16px;
+        box-shadow: 0 2px 8px rgba(102, 205, 170, 0.3);
+        padding: 0 15px;
+    }}
+    
+    .question-text {{
+        padding: 20px 0;
+        margin-bottom: 20px;
+        font-size: 18px;
+        line-height: 1.7;
+        font-weight: 500;
+        color: #2d2d2d;
+    }}
+    
+    .options {{
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 15px;
+    }}
+    
+    .option {{
+        background-color: #f8f9fa;
+        border: 2px solid #dee2e6;
+        border-radius: 8px;
+        padding: 15px;
+        font-size: 16px;
+        display: flex;
+        align-items: flex-start;
+        gap: 12px;
+        transition: all 0.2s ease;
+    }}
+    
+    .option-label {{
+        background-color: #6c757d;
+        color: white;
+        width: 28px;
+        height: 28px;
+        border-radius: 50%;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 14px;
+        flex-shrink: 0;
+    }}
+    
+    @media (max-width: 768px) {{
+        .options {{
+            grid-template-columns: 1fr;
+        }}
+        
+        .syllabus-content {{
+            width: 100%;
+        }}
+        
+        body {{
+            padding: 15px;
+        }}
+        
+        .question-header {{
+            flex-direction: column;
+            align-items: flex-start;
+        }}
+        
+        .question-watermark {{
+            top: 12px;
+            right: 15px;
+            padding: 6px 12px;
+            font-size: 12px;
+            letter-spacing: 0.5px;
+        }}
+    }}
+</style>
+</head>
+<body>
+    <div class='header'>
+        <h1>{test_title} - Questions Only</h1>
+    </div>
+    {syllabus_html}
+    """
+    
+    for idx, q in enumerate(data, 1):
+        processed_body = q['body']
+        
+        html += f"""
+    <div class='question-container'>
+        <a href='https://t.me/NEETSQUARE' target='_blank' class='question-watermark'>NEETSQUARE</a>
+        <div class='question-header'>
+            <div class='question-number'>Question {idx}</div>
+        </div>
+        <div class='question-text'>{processed_body}</div>
+        <div class='options'>
+        """
+        
+        # Options (no correct answer marking)
+        for label, processed_answer, is_correct in q["options"]:
+            html += f"""
+            <div class='option'>
+                <div class='option-label'>{label}</div>
+                <div class='option-text'>{processed_answer}</div>
+            </div>
+                """
+        
+        html += """
+        </div>
+    </div>
+        """
+    
+    html += """
+</body>
+</html>
+    """
+    
+    return html
+
+
+def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
+    """Generate HTML with questions and marked correct answers (NO solutions). data comes from prepare_questions."""
+    html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>{test_title}</title>
+<style>
+    * {{
+        margin: 0;
+        padding: 0;
+        box-sizing: border-box;
+    }}
+    
+    body {{
+        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+        background-color: #ffffff;
+        color: #333333;
+        padding: 20px;
+        line-height: 1.6;
+        max-width: 1200px;
+        margin: 0 auto;
+        position: relative;
+    }}
+    
+    .header {{
+        text-align: center;
+        background: linear-gradient(135deg, #e3f2fd, #bbdefb);
+        color: #0d47a1;
+        padding: 30px;
+        border-radius: 12px;
+        margin-bottom: 30px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.08);
+        border: 2px solid #90caf9;
+        position: relative;
+        z-index: 2;
+    }}
+    
+    .header h1 {{
+        font-size: 32px;
+        font-weight: bold;
+    }}
+    
+    /* --- SYLLABUS BOX STYLES (REQUIRED FOR ALL) --- */
+    .syllabus-container {{
+        border: 2px solid #ced4da;
+        border-radius: 12px;
+        padding: 20px;
+        margin-bottom: 30px;
+        background-color: #f8f9fa;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
+        page-break-inside: avoid;
+    }}
+    
+    .syllabus-header h2 {{
+        font-size: 24px;
+        color: #1976d2;
+        border-bottom: 3px solid #1976d2;
+        padding-bottom: 10px;
+        margin-bottom: 20px;
+        text-align: left;
+        font-weight: 600;
+        display: flex;
+        align-items: center;
+        gap: 10px;
+    }}
+    
+    .syllabus-content {{
+        display: block;
+        width: 100%;
+        background-color: #ffffff;
+        padding: 20px;
+        border-radius: 8px;
+        border: 1px solid #e0e0e0;
+    }}
+    
+    .subject-line {{
+        margin-bottom: 15px;
+        font-size: 16px;
+        line-height: 1.6;
+    }}
+    
+    .subject-name {{
+        font-weight: bold;
+        color: #1565c0;
+        display: inline-block;
+        min-width: 80px;
+    }}
+    
+    .subject-topics {{
+        color: #424242;
+        margin-left: 10px;
+    }}
+    /* --- END SYLLABUS BOX STYLES --- */
+    
+    .question-container {{
+        background-color: #ffffff;
+        border: 2px solid #e9ecef;
+        border-radius: 12px;
+        padding: 25px;
+        margin-bottom: 30px;
+        page-break-inside: avoid;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+        position: relative;
+        z-index: 2;
+    }}
+    
+    .question-watermark {{
+        position: absolute;
+        top: 15px;
+        right: 20px;
+        background: linear-gradient(135deg, rgba(100, 181, 246, 0.2), rgba(66, 165, 245, 0.2));
+        padding: 8px 16px;
+        border-radius: 20px;
+        border: 2px solid rgba(33, 150, 243, 0.4);
+        backdrop-filter: blur(10px);
+        font-size: 14px;
+        font-weight: bold;
+        color: rgba(13, 71, 161, 0.9);
+        z-index: 3;
+        pointer-events: auto;
+        user-select: none;
+        white-space: nowrap;
+        letter-spacing: 1px;
+        box-shadow: 0 2px 8px rgba(33, 150, 243, 0.2);
+        text-decoration: none;
+        transition: all 0.3s ease;
+    }}
+    
+    .question-watermark:hover {{
+        background: linear-gradient(135deg, rgba(100, 181, 246, 0.35), rgba(66, 165, 245, 0.35));
+        border-color: rgba(33, 150, 243, 0.6);
+        color: rgba(13, 71, 161, 1);
+        transform: scale(1.05);
+    }}
+    
+    .question-header {{
+        display: flex;
+        align-items: center;
+        margin-bottom: 20px;
+    }}
+    
+    .question-number {{
+        background: linear-gradient(135deg, #42a5f5, #1976d2);
+        color: white;
+        min-width: 120px;
+        height: 40px;
+        border-radius: 20px;
+        display: inline-flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 16px;
+        box-shadow: 0 2px 8px rgba(33, 150, 243, 0.3);
+        padding: 0 15px;
+    }}
+    
+    .question-text {{
+        padding: 20px 0;
+        margin-bottom: 20px;
+        font-size: 18px;
+        line-height: 1.7;
+        font-weight: 500;
+        color: #2d2d2d;
+    }}
+    
+    .options {{
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 15px;
+    }}
+    
+    .option {{
+        background-color: #f8f9fa;
+        border: 2px solid #dee2e6;
+        border-radius: 8px;
+        padding: 15px;
+        font-size: 16px;
+        display: flex;
+        align-items: flex-start;
+        gap: 12px;
+        transition: all 0.2s ease;
+    }}
+    
+    .option.correct {{
+        background-color: #e3f2fd;
+        border-color: #1976d2;
+        color: #0d47a1;
+        font-weight: 600;
+        box-shadow: 0 2px 8px rgba(25,118,210,0.2);
+        position: relative;
+    }}
+    
+    .option-label {{
+        background-color: #6c757d;
+        color: white;
+        width: 28px;
+        height: 28px;
+        border-radius: 50%;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 14px;
+        flex-shrink: 0;
+    }}
+    
+    .option.correct .option-label {{
+        background-color: #1976d2;
+    }}
+    
+    @media (max-width: 768px) {{
+        .options {{
+            grid-template-columns: 1fr;
+        }}
+        
+        .syllabus-content {{
+            width: 100%;
+        }}
+        
+        body {{
+            padding: 15px;
+        }}
+        
+        .question-header {{
+            flex-direction: column;
+            align-items: flex-start;
+        }}
+        
+        .question-watermark {{
+            top: 12px;
+            right: 15px;
+            padding: 6px 12px;
+            font-size: 12px;
+            letter-spacing: 0.5px;
+        }}
+    }}
+</style>
+</head>
+<body>
+    <div class='header'>
+        <h1>{test_title} - Questions with Answers</h1>
+    </div>
+    {syllabus_html}
+    """
+    
+    for idx, q in enumerate(data, 1):
+        processed_body = q['body']
+        
+        html += f"""
+    <div class='question-container'>
+        <a href='https://t.me/SAD_LYFFFF' target='_blank' class='question-watermark'>SAD_LYFFFF</a>
+        <div class='question-header'>
+            <div class='question-number'>Question {idx}</div>
+        </div>
+        <div class='question-text'>{processed_body}</div>
+        <div class='options'>
+        """
+        
+        # Options with correct answer marking
+        for label, processed_answer, is_correct in q["options"]:
+            opt_class = "option correct" if is_correct else "option"
+            html += f"""
+            <div class='{opt_class}'>
+                <div class='option-label'>{label}</div>
+                <div class='option-text'>{processed_answer}</div>
+            </div>
+                """
+        
+        html += """
+        </div>
+    </div>
+        """
+    
+    html += """
+</body>
+</html>
+    """
+    
+    return html
+
+
+def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
+    """Generate HTML with questions, marked correct answers, and solutions. data comes from prepare_questions(..., with_solutions=True)."""
+    html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>{test_title}</title>
+<style>
+    * {{
+        margin: 0;
+        padding: 0;
+        box-sizing: border-box;
+    }}
+    
+    body {{
+        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+        background-color: #ffffff;
+        color: #333333;
+        padding: 20px;
+        line-height: 1.6;
+        max-width: 1200px;
+        margin: 0 auto;
+        position: relative;
+    }}
+    
+    .header {{
+        text-align: center;
+        background: linear-gradient(135deg, #e8f5e8, #f0f9f0);
+        color: #2d5a2d;
+        padding: 30px;
+        border-radius: 12px;
+        margin-bottom: 30px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.08);
+        border: 2px solid #c3e6c3;
+        position: relative;
+        z-index: 2;
+    }}
+    
+    .header h1 {{
+        font-size: 32px;
+        font-weight: bold;
+    }}
+    
+    /* --- SYLLABUS BOX STYLES (REQUIRED FOR ALL) --- */
+    .syllabus-container {{
+        border: 2px solid #ced4da;
+        border-radius: 12px;
+        padding: 20px;
+        margin-bottom: 30px;
+        background-color: #f8f9fa;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
+        page-break-inside: avoid;
+    }}
+    
+    .syllabus-header h2 {{
+        font-size: 24px;
+        color: #2196f3;
+        border-bottom: 3px solid #2196f3;
+        padding-bottom: 10px;
+        margin-bottom: 20px;
+        text-align: left;
+        font-weight: 600;
+        display: flex;
+        align-items: center;
+        gap: 10px;
+    }}
+    
+    .syllabus-content {{
+        display: block;
+        width: 100%;
+        background-color: #ffffff;
+        padding: 20px;
+        border-radius: 8px;
+        border: 1px solid #e0e0e0;
+    }}
+    
+    .subject-line {{
+        margin-bottom: 15px;
+        font-size: 16px;
+        line-height: 1.6;
+    }}
+    
+    .subject-name {{
+        font-weight: bold;
+        color: #2d5a2d;
+        display: inline-block;
+        min-width: 80px;
+    }}
+    
+    .subject-topics {{
+        color: #424242;
+        margin-left: 10px;
+    }}
+    /* --- END SYLLABUS BOX STYLES --- */
+    
+    .question-container {{
+        background-color: #ffffff;
+        border: 2px solid #e9ecef;
+        border-radius: 12px;
+        padding: 25px;
+        margin-bottom: 30px;
+        page-break-inside: avoid;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+        position: relative;
+        z-index: 2;
+    }}
+    
+    .question-watermark {{
+        position: absolute;
+        top: 15px;
+        right: 20px;
+        background: linear-gradient(135deg, rgba(173, 216, 230, 0.2), rgba(144, 238, 144, 0.2));
+        padding: 8px 16px;
+        border-radius: 20px;
+        border: 2px solid rgba(102, 205, 170, 0.4);
+        backdrop-filter: blur(10px);
+        font-size: 14px;
+        font-weight: bold;
+        color: rgba(72, 139, 139, 0.9);
+        z-index: 3;
+        pointer-events: auto;
+        user-select: none;
+        white-space: nowrap;
+        letter-spacing: 1px;
+        box-shadow: 0 2px 8px rgba(102, 205, 170, 0.2);
+        text-decoration: none;
+        transition: all 0.3s ease;
+    }}
+    
+    .question-watermark:hover {{
+        background: linear-gradient(135deg, rgba(173, 216, 230, 0.35), rgba(144, 238, 144, 0.35));
+        border-color: rgba(102, 205, 170, 0.6);
+        color: rgba(72, 139, 139, 1);
+        transform: scale(1.05);
+    }}
+    
+    .question-header {{
+        display: flex;
+        align-items: center;
+        margin-bottom: 20px;
+    }}
+    
+    .question-number {{
+        background: linear-gradient(135deg, #66cdaa, #48a999);
+        color: white;
+        min-width: 120px;
+        height: 40px;
+        border-radius: 20px;
+        display: inline-flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 16px;
+        box-shadow: 0 2px 8px rgba(102, 205, 170, 0.3);
+        padding: 0 15px;
+    }}
+    
+    .question-text {{
+        padding: 20px 0;
+        margin-bottom: 20px;
+        font-size: 18px;
+        line-height: 1.7;
+        font-weight: 500;
+        color: #2d2d2d;
+    }}
+    
+    .options {{
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 15px;
+    }}
+    
+    .option {{
+        background-color: #f8f9fa;
+        border: 2px solid #dee2e6;
+        border-radius: 8px;
+        padding: 15px;
+        font-size: 16px;
+        display: flex;
+        align-items: flex-start;
+        gap: 12px;
+        transition: all 0.2s ease;
+    }}
+    
+    .option.correct {{
+        background-color: #d4edda;
+        border-color: #28a745;
+        color: #155724;
+        font-weight: 600;
+        box-shadow: 0 2px 8px rgba(40,167,69,0.2);
+        position: relative;
+    }}
+    
+    .option-label {{
+        background-color: #6c757d;
+        color: white;
+        width: 28px;
+        height: 28px;
+        border-radius: 50%;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 14px;
+        flex-shrink: 0;
+    }}
+    
+    .option.correct .option-label {{
+        background-color: #28a745;
+    }}
+    
+    .solution-section {{
+        background: linear-gradient(135deg, #e3f2fd, #bbdefb);
+        border: 2px solid #2196f3;
+        border-radius: 12px;
+        padding: 20px;
+        margin-top: 20px;
+    }}
+    
+    .solution-header {{
+        display: flex;
+        align-items: center;
+        margin-bottom: 15px;
+    }}
+    
+    .solution-icon {{
+        background: linear-gradient(135deg, #2196f3, #1976d2);
+        color: white;
+        width: 32px;
+        height: 32px;
+        border-radius: 50%;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-weight: bold;
+        font-size: 16px;
+        margin-right: 12px;
+    }}
+    
+    .solution-title {{
+        font-size: 18px;
+        font-weight: bold;
+        color: #1976d2;
+    }}
+    
+    .solution-content {{
+        font-size: 16px;
+        line-height: 1.7;
+        color: #424242;
+        background-color: #ffffff;
+        padding: 15px;
+        border-radius: 8px;
+        border: 1px solid #e0e0e0;
+    }}
+    
+    .no-solution {{
+        color: #757575;
+        font-style: italic;
+        text-align: center;
+        padding: 15px;
+        background-color: #fafafa;
+        border-radius: 8px;
+        border: 1px dashed #e0e0e0;
+    }}
+    
+    @media (max-width: 768px) {{
+        .options {{
+            grid-template-columns: 1fr;
+        }}
+        
+        .syllabus-content {{
+            width: 100%;
+        }}
+        
+        body {{
+            padding: 15px;
+        }}
+        
+        .question-header {{
+            flex-direction: column;
+            align-items: flex-start;
+        }}
+        
+        .question-watermark {{
+            top: 12px;
+            right: 15px;
+            padding: 6px 12px;
+            font-size: 12px;
+            letter-spacing: 0.5px;
+        }}
+    }}
+</style>
+</head>
+<body>
+    <div class='header'>
+        <h1>{test_title}</h1>
+    </div>
+    {syllabus_html}
+    """
+    
+    for idx, q in enumerate(data, 1):
+        processed_body = q['body']
+        
+        html += f"""
+    <div class='question-container'>
+        <a href='https://t.me/NEETSQUARE' target='_blank' class='question-watermark'>NEETSQUARE</a>
+        <div class='question-header'>
+            <div class='question-number'>Question {idx}</div>
+        </div>
+        <div class='question-text'>{processed_body}</div>
+        <div class='options'>
+        """
+        
+        # Options with correct answer marking
+        for label, processed_answer, is_correct in q["options"]:
+            opt_class = "option correct" if is_correct else "option"
+            html += f"""
+            <div class='{opt_class}'>
+                <div class='option-label'>{label}</div>
+                <div class='option-text'>{processed_answer}</div>
+            </div>
+                """
+        
+        html += """
+        </div>
+        """
+        
+        # Add solution section after each question
+        html += """
+        <div class='solution-section'>
+            <div class='solution-header'>
+                <div class='solution-icon'>💡</div>
+                <div class='solution-title'>Solution</div>
+            </div>
+        """
+        
+        if q["solution"]:
+            html += f"""
+            <div class='solution-content'>{q["solution"]}</div>
+            """
+        else:
+            html += f"""
+            <div class='no-solution'>
+                No detailed solution available for this question.
+            </div>
+            """
+        
+        html += """
+        </div>
+    </div>
+        """
+    
+    html += """
+</body>
+</html>
+    """
+    
+    return html
@@ -0,0 +1,65 @@
+"""
+Document builder benchmark: the list-and-join builder (assemble_document and the
+RENDER_FORMATS fragments) against the generators it replaced, which grew one string
+with repeated += (benchmarks/baseline_generators.py). Both run on the same prepared
+questions and must produce byte-identical documents. The last column times only
+assemble_document, i.e. a render whose fragments all come from the fragment cache.
+
+    python benchmarks/bench_document_builder.py [SIZES...]   (default: 200 1000 5000)
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import info
+import baseline_generators
+
+LEGACY_GENERATORS = {
+    "Questions_Only": baseline_generators.generate_questions_only_html,
+    "Questions_Answers": baseline_generators.generate_questions_answers_only_html,
+    "Questions_Solutions": baseline_generators.generate_questions_with_answers_html,
+}
+
+def build_document(format_name, data, test_title, syllabus_html=""):
+    render_format = info.RENDER_FORMATS[format_name]
+    return info.assemble_document(
+        render_format.head(test_title, syllabus_html), render_format.number_template,
+        [render_format.fragment(q) for q in data],
+    )
+
+def prepared_question(i):
+    """
+    A prepared question (see info.prepare_questions) of typical size. Solutions are never
+    "": the baseline generators rendered those as missing (fixed since, see user-011).
+    """
+    return {
+        "body": f"<p>Question body {i} with some text " * 3 + "</p>",
+        "options": [(label, f"Option text {label} {i}", label == "A") for label in info.OPTION_LABELS],
+        "solution": "<p>Solution text </p>" * 5 if i % 10 else None,
+    }
+
+def best_of(func, number=5, repeat=7):
+    """Best per-call time in milliseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+def main(sizes):
+    print(f"{'questions':>9}  {'format':<20} {'+= (ms)':>9} {'join (ms)':>10} {'speedup':>8} {'cached (ms)':>12}")
+    for size in sizes:
+        data = [prepared_question(i) for i in range(size)]
+        for format_name, legacy in LEGACY_GENERATORS.items():
+            if legacy(data, "T", "<div>S</div>") != build_document(format_name, data, "T", "<div>S</div>"):
+                sys.exit(f"{format_name}: builder output differs from the reference generator")
+            render_format = info.RENDER_FORMATS[format_name]
+            fragments = [render_format.fragment(q) for q in data]
+            old = best_of(lambda: legacy(data, "T"))
+            new = best_of(lambda: build_document(format_name, data, "T"))
+            cached = best_of(lambda: info.assemble_document(
+                render_format.head("T", ""), render_format.number_template, fragments
+            ))
+            print(f"{size:>9}  {format_name:<20} {old:>9.2f} {new:>10.2f} {old / new:>7.2f}x {cached:>12.2f}")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [200, 1000, 5000])
@@ -0,0 +1,40 @@
+"""
+Text normalization microbenchmark: clean_text_for_telegram, clean_solution_content and
+process_html_content against the previous re.sub/str.replace chains (the reference
+copies in tests/test_text_normalization.py), per call on fragments of about 400 atoms.
+The fragment memo is bypassed.
+
+    python benchmarks/bench_text_normalization.py
+"""
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+import info
+from test_text_normalization import (
+    legacy_clean_solution_content, legacy_clean_text_for_telegram, legacy_process_html_content, random_texts,
+)
+
+CASES = [
+    ("clean_text_for_telegram", legacy_clean_text_for_telegram, info.clean_text_for_telegram),
+    ("clean_solution_content", legacy_clean_solution_content, info.clean_solution_content.__wrapped__),
+    ("process_html_content", legacy_process_html_content, info.process_html_content.__wrapped__),
+]
+
+def per_call_us(func, texts, repeat=5):
+    """Best time per call in microseconds."""
+    best = min(timeit.repeat(lambda: [func(text) for text in texts], number=1, repeat=repeat))
+    return best / len(texts) * 1e6
+
+def main():
+    texts = random_texts(2000, seed=16, max_atoms=400)
+    print(f"{'function':<24} {'before (us)':>12} {'after (us)':>11}")
+    for name, old, new in CASES:
+        print(f"{name:<24} {per_call_us(old, texts):>12.1f} {per_call_us(new, texts):>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Load test: /info latency while extractions are running. The real Application serves
+webhook updates from a stand-in Bot API (tests/fake_telegram.py) and reads a stand-in
+upstream (tests/fake_upstream.py) whose question endpoint answers slowly, so that
+extractions hold their slots. Each /info sample asks for a new NID (no cache hits).
+
+    python benchmarks/load_info_latency.py [EXTRACTIONS] [QUESTION_DELAY_SECONDS]
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+import info
+from bot_harness import point_bot_at, start_webhook
+from fake_telegram import FakeBotApi, callback_update, command_update
+from fake_upstream import FakeUpstream
+
+SAMPLES = 10
+
+class Harness:
+    def __init__(self, api, upstream):
+        self.api = api
+        self.upstream = upstream
+        self.update_ids = iter(range(1, 10 ** 9))
+        self.info_nids = iter(range(7_000_000, 8_000_000))
+
+    async def send(self, update_factory, *args):
+        return await self.api.post_update(update_factory(next(self.update_ids), *args))
+
+    async def info_latency(self, user_id):
+        """Milliseconds from posting /info for a fresh NID until the bot shows its details."""
+        nid = next(self.info_nids)
+        title = f"Demo Test {nid}"
+        started = time.perf_counter()
+        await self.send(command_update, user_id, f"/info {nid}")
+        await self.api.wait_for(lambda: any(title in c.get("text", "") for c in self.api.called("editMessageText")), 60)
+        return (time.perf_counter() - started) * 1000
+
+async def run(extractions, question_delay):
+    api = await FakeBotApi().start()
+    upstream = await FakeUpstream(questions=200).start()
+    point_bot_at(pytest.MonkeyPatch(), api, upstream, tempfile.mkdtemp(prefix="load_info_latency_"))
+
+    harness = Harness(api, upstream)
+    owner = info.AUTHORIZED_USER_IDS[0]
+    stop, server = await start_webhook(api, info.build_application())
+
+    await harness.info_latency(owner)  # Warm up connections
+    idle = [await harness.info_latency(owner) for _ in range(SAMPLES)]
+
+    users = [900_000 + i for i in range(extractions)]
+    info.AUTHORIZED_USER_IDS.extend(users)
+    upstream.delay["questions"] = question_delay
+    for user_id in users:
+        await harness.send(command_update, user_id, "/extract")
+        await harness.send(command_update, user_id, str(5_000_000 + user_id))
+    for user_id in users:
+        await harness.send(callback_update, user_id, "questions_only")
+    await asyncio.sleep(0.2)
+
+    busy_started = time.perf_counter()
+    busy = [await harness.info_latency(owner) for _ in range(SAMPLES)]
+    still_running = info.EXTRACTION_STATS["running"] + info.EXTRACTION_STATS["queued"]
+    await api.wait_for(lambda: len(api.called("sendDocument")) >= extractions, 60 + extractions * question_delay)
+    print(f"{extractions} extractions delivered in {time.perf_counter() - busy_started:.1f}s "
+          f"({still_running} still running or queued after the /info samples)")
+
+    for label, samples in (("idle", idle), (f"during {extractions} extractions", busy)):
+        print(f"/info latency {label}: median {statistics.median(samples):.0f} ms, max {max(samples):.0f} ms")
+
+    stop.set()
+    await server
+    await upstream.close()
+    await api.close()
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings("ignore")
+    extractions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    question_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    asyncio.run(run(extractions, question_delay))
@@ -1,15 +1,35 @@
+import asyncio
 import json
+import os
+import sqlite3
+import threading
+import functools
+import hashlib
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 import requests
 from io import BytesIO
+from html import unescape as html_unescape
 import logging
 import re
+import secrets
+import signal
 from bs4 import BeautifulSoup
+try:
+    from lxml import etree as lxml_etree, html as lxml_html
+except ImportError:  # lxml is optional; sanitization falls back to html.parser
+    lxml_etree = lxml_html = None
 import time
 import socket
 import aiohttp
+from aiohttp import web
 from datetime import datetime
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaDocument
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -19,7 +39,7 @@ from telegram.ext import (
     filters,
     CallbackQueryHandler,
 )
-from telegram.error import Conflict, NetworkError, TimedOut
+from telegram.error import BadRequest, Conflict, NetworkError, TelegramError, TimedOut
 
 # Configure logging
 logging.basicConfig(
@@ -37,6 +57,9 @@ OWNER_ID = 7927314662  # The main owner who can authorize users
 # NOTE: AUTHORIZED_USER_IDS is mutable and will be modified at runtime.
 AUTHORIZED_USER_IDS = [7927314662, 8188515782, 7686927258, 8293981933]
 
+# Bot API endpoint; point it at a local stand-in server for testing
+TELEGRAM_API_BASE_URL = os.environ.get("TELEGRAM_API_BASE_URL", "https://api.telegram.org/bot")
+
 def check_internet_connection():
     """Check if internet connection is available"""
     try:
@@ -48,13 +71,29 @@ def check_internet_connection():
 def test_telegram_api(token):
     """Test if Telegram API is accessible"""
     try:
-        url = f"https://api.telegram.org/bot{token}/getMe"
+        url = f"{TELEGRAM_API_BASE_URL}{token}/getMe"
         response = requests.get(url, timeout=10)
         return response.status_code == 200
     except Exception as e:
         logger.error(f"Telegram API test failed: {e}")
         return False
 
+# Text normalization patterns, compiled once and shared by the cleaning helpers below.
+# Each pass is skipped when the character it needs is absent, which is the common case.
+LINE_ENDING_RE = re.compile(r'\r\n?')
+HTML_TAG_RE = re.compile(r'<[^>]*>')
+HTML_ENTITY_RE = re.compile(r'&[a-zA-Z0-9#]+;')
+TELEGRAM_UNSAFE_CHARS_RE = re.compile(r'[^\w\s\-\.\(\),:\n/]')
+WHITESPACE_RUN_RE = re.compile(r'\s{2,}')
+SOLUTION_JSON_HEAD_RE = re.compile(r'\{[\'"]nid[\'"]:\s*[\'"][0-9]+[\'"],\s*[\'"]content[\'"]:\s*[\'"]')
+SOLUTION_JSON_TAIL_RE = re.compile(r',\s*[\'"]clipping_nid[\'"]:\s*None,\s*[\'"]type[\'"]:\s*[\'"]HTML5[\'"],\s*[\'"]duration[\'"]:\s*None\}.*?$')
+BRACED_ARTIFACT_RE = re.compile(r'\{[^}]*\}')
+ESCAPED_LINE_BREAK_RE = re.compile(r'\\r\\n|\\r|\\n')
+NEWLINE_RUN_RE = re.compile(r'\n+')
+HEAD_CONTENT_RE = re.compile(r'<(?:head|title|style|meta|link|base)[\s/>]', re.IGNORECASE)
+INLINE_OPEN_TAG_RE = re.compile(r'<(?:a|abbr|b|big|cite|code|em|font|i|label|nobr|s|small|span|strike|strong|sub|sup|tt|u)[\s>]', re.IGNORECASE)
+BLOCK_OPEN_TAG_RE = re.compile(r'<(?:address|blockquote|center|div|dl|form|h[1-6]|li|ol|p|pre|table|ul)[\s>]', re.IGNORECASE)
+
 def clean_text_for_telegram(text):
     """Clean text to prevent Telegram parsing errors and normalize line endings."""
     if not text:
@@ -63,25 +102,22 @@ def clean_text_for_telegram(text):
     # Convert to string and basic cleaning
     text = str(text).strip()
     
-    # --- Line Ending Normalization ---
-    # 1. Normalize all line endings to just '\n' (removes all '\r')
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
-    
-    # 2. Consolidate consecutive newlines into clean paragraph breaks (\n\n)
-    text = re.sub(r'\n{2,}', '\n\n', text).strip()
-    # --------------------------------
+    # Normalize all line endings to just '\n' (removes all '\r'). Runs of blank lines
+    # need no separate pass: the whitespace cleanup below collapses them anyway.
+    if '\r' in text:
+        text = LINE_ENDING_RE.sub('\n', text)
     
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*>', '', text)
-    
-    # Remove HTML entities
-    text = re.sub(r'&[a-zA-Z0-9#]+;', '', text)
+    # Remove HTML tags, then entities (in that order: removing a tag can complete an entity)
+    if '<' in text:
+        text = HTML_TAG_RE.sub('', text)
+    if '&' in text:
+        text = HTML_ENTITY_RE.sub('', text)
     
     # Remove problematic characters that can cause parsing issues
-    text = re.sub(r'[^\w\s\-\.\(\),:\n/]', '', text)
+    text = TELEGRAM_UNSAFE_CHARS_RE.sub('', text)
     
     # Clean up excess whitespace (this happens after line normalization)
-    text = re.sub(r'\s{2,}', ' ', text).strip()
+    text = WHITESPACE_RUN_RE.sub(' ', text).strip()
 
     # Limit length to prevent issues
     if len(text) > 800:
@@ -89,9 +125,741 @@ def clean_text_for_telegram(text):
     
     return text if text else "N/A"
 
-def fetch_locale_json_from_api(nid: str):
+class LRUCache:
+    """Bounded in-memory mapping with least-recently-used eviction, optional expiry and hit/miss counters."""
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= time.time()):
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Returns a short 'size/max, hits, misses' summary."""
+        return f"{len(self._entries)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses"
+
+# Shared upstream client for learn.aakashitutor.com
+UPSTREAM_BASE_URL = "https://learn.aakashitutor.com"
+UPSTREAM_MAX_CONNECTIONS = 32  # Pooled keep-alive connections to the upstream host
+UPSTREAM_KEEPALIVE_TIMEOUT = 60
+
+_upstream_session = None
+
+def get_upstream_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use inside the running loop."""
+    global _upstream_session
+    if _upstream_session is None or _upstream_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=UPSTREAM_MAX_CONNECTIONS,
+            limit_per_host=UPSTREAM_MAX_CONNECTIONS,
+            keepalive_timeout=UPSTREAM_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        _upstream_session = aiohttp.ClientSession(connector=connector)
+    return _upstream_session
+
+async def close_upstream_session(application=None) -> None:
+    """Close the shared upstream session."""
+    global _upstream_session
+    if _upstream_session is not None and not _upstream_session.closed:
+        await _upstream_session.close()
+    _upstream_session = None
+
+# On-disk cache of raw upstream responses (survives bot restarts)
+CACHE_DIR = os.environ.get("CACHE_DIR", "cache")
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 6 * 3600))  # Seconds before an entry is revalidated
+RESPONSE_CACHE_OPEN_TTL = int(os.environ.get("RESPONSE_CACHE_OPEN_TTL", 60))  # For tests that are currently open
+RESPONSE_CACHE_FINAL_TTL = int(os.environ.get("RESPONSE_CACHE_FINAL_TTL", 30 * 24 * 3600))  # Closed, results out
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+def parse_timestamp(value):
+    """Returns a unix timestamp from an API field, or None when missing/invalid."""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+def cache_expiry(fetched_at, quiz_open=None, quiz_close=None, show_results=None, ttl=RESPONSE_CACHE_TTL):
+    """
+    Returns when a response fetched at fetched_at goes stale, given the test's schedule.
+    - Closed tests whose results were already out when fetched are effectively immutable.
+    - Open tests are revalidated every RESPONSE_CACHE_OPEN_TTL seconds.
+    - An entry never outlives the next quiz_open/quiz_close/show_results boundary after
+      it was fetched, so the open-test TTL applies from the moment the test opens and a
+      pre-results payload is never served once solutions are published.
+    """
+    upcoming = [t for t in (quiz_close, show_results) if t and t > fetched_at]
+    if show_results and not upcoming:
+        return fetched_at + RESPONSE_CACHE_FINAL_TTL
+    if quiz_open and quiz_open > fetched_at:
+        upcoming.append(quiz_open)
+
+    if quiz_open and quiz_close and quiz_open <= fetched_at < quiz_close:
+        ttl = min(ttl, RESPONSE_CACHE_OPEN_TTL)
+    return min([fetched_at + ttl] + upcoming)
+
+class ResponseCache:
+    """
+    SQLite-backed store of raw upstream response bodies keyed by URL.
+    Keeps the ETag/Last-Modified validators for conditional revalidation, derives each
+    entry's expiry from its test's schedule (see cache_expiry) and evicts least recently
+    used entries once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, path, ttl, max_bytes):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, last_modified TEXT,"
+            " fetched_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(responses)")]
+        if "nid" not in columns:
+            self._db.execute("ALTER TABLE responses ADD COLUMN nid TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_nid ON responses (nid)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS schedules ("
+            " nid TEXT PRIMARY KEY, quiz_open INTEGER, quiz_close INTEGER, show_results INTEGER)"
+        )
+        self._db.commit()
+
+    def get(self, url):
+        """Returns the cached entry for url as a dict (fresh or not), or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, fetched_at, expires_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        body, etag, last_modified, fetched_at, expires_at = row
+        return {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+            "expires_at": expires_at,
+        }
+
+    def put(self, url, body, etag=None, last_modified=None, nid=None):
+        """Stores a freshly fetched body and evicts old entries if over the size cap."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (url, body, etag, last_modified, fetched_at, expires_at, accessed_at, size, nid)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now, self._expiry(nid, now), now, len(body), nid),
+            )
+            self._evict()
+            self._db.commit()
+
+    def revalidated(self, url):
+        """Marks an entry fresh again after the upstream answered 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT nid FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            self._db.execute(
+                "UPDATE responses SET fetched_at = ?, expires_at = ?, accessed_at = ? WHERE url = ?",
+                (now, self._expiry(row[0], now), now, url),
+            )
+            self._db.commit()
+
+    def update_schedule(self, nid, metadata):
+        """Records a test's open/close/results timestamps and re-derives its entries' expiry."""
+        schedule = (
+            parse_timestamp(metadata.get("quiz_open")),
+            parse_timestamp(metadata.get("quiz_close")),
+            parse_timestamp(metadata.get("show_results")),
+        )
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?)", (nid,) + schedule)
+            for url, fetched_at in self._db.execute(
+                "SELECT url, fetched_at FROM responses WHERE nid = ?", (nid,)
+            ).fetchall():
+                self._db.execute(
+                    "UPDATE responses SET expires_at = ? WHERE url = ?",
+                    (cache_expiry(fetched_at, *schedule, ttl=self.ttl), url),
+                )
+            self._db.commit()
+
+    def _expiry(self, nid, fetched_at):
+        schedule = None
+        if nid is not None:
+            schedule = self._db.execute(
+                "SELECT quiz_open, quiz_close, show_results FROM schedules WHERE nid = ?", (nid,)
+            ).fetchone()
+        return cache_expiry(fetched_at, *(schedule or ()), ttl=self.ttl)
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """Return the shared response cache, opening it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _response_cache = ResponseCache(
+            os.path.join(CACHE_DIR, "responses.sqlite3"), RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES
+        )
+    return _response_cache
+
+# Adaptive timeouts and hedging for upstream requests
+UPSTREAM_MIN_TIMEOUT = 5
+UPSTREAM_MAX_TIMEOUT = 45
+UPSTREAM_TIMEOUT_MULTIPLIER = 3  # Attempt timeout = multiplier x observed p95 latency x attempt number
+UPSTREAM_HEDGING = os.environ.get("UPSTREAM_HEDGING", "1") == "1"
+UPSTREAM_LATENCY_WINDOW = 200  # Number of recent samples used for percentiles
+
+class LatencyTracker:
+    """Tracks recent upstream latencies as an EWMA plus a sliding window for percentiles."""
+
+    def __init__(self, window=UPSTREAM_LATENCY_WINDOW, alpha=0.2):
+        self.alpha = alpha
+        self.ewma = None
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self._samples.append(seconds)
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def percentile(self, fraction):
+        """Returns the given percentile (0-1) of the recent samples, or None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def timeout_for(self, attempt, default):
+        """Timeout for the given (0-based) attempt; falls back to default until samples exist."""
+        p95 = self.percentile(0.95)
+        if p95 is None:
+            return default
+        timeout = max(p95, self.ewma) * UPSTREAM_TIMEOUT_MULTIPLIER * (attempt + 1)
+        return min(UPSTREAM_MAX_TIMEOUT, max(UPSTREAM_MIN_TIMEOUT, timeout))
+
+    def hedge_delay(self):
+        """How long to wait before firing a hedge request (the observed p95), or None."""
+        return self.percentile(0.95)
+
+    def stats(self):
+        if not self._samples:
+            return "no samples"
+        return (
+            f"p50 {self.percentile(0.5):.2f}s, p95 {self.percentile(0.95):.2f}s, "
+            f"ewma {self.ewma:.2f}s ({len(self._samples)} samples)"
+        )
+
+upstream_latency = {
+    "questions": LatencyTracker(),
+    "metadata": LatencyTracker(),
+}
+
+# Host-level protection for learn.aakashitutor.com
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures before the circuit opens
+CIRCUIT_COOLDOWN = 30  # Seconds to fail fast before letting a probe request through
+UPSTREAM_RATE_LIMIT = float(os.environ.get("UPSTREAM_RATE_LIMIT", 5))  # Requests per second, all callers
+UPSTREAM_RATE_BURST = int(os.environ.get("UPSTREAM_RATE_BURST", 10))
+
+class CircuitOpenError(Exception):
+    """Raised instead of contacting the upstream while its circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Fails fast for a cool-down period after repeated upstream failures.
+    After the cool-down a single probe request is let through (half-open); its
+    outcome closes the circuit again or restarts the cool-down.
+    """
+
+    def __init__(self, failure_threshold, cooldown):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def before_request(self):
+        """
+        Raises CircuitOpenError when the request must not be sent.
+        Returns True when the request is the half-open probe.
+        """
+        if self.state == "closed":
+            return False
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError("learn.aakashitutor.com circuit is open; failing fast")
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("Upstream circuit closed again")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Lets another probe through after the current one was abandoned without an outcome."""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logger.warning(f"Upstream circuit opened after {self.failures} failure(s); cooling down {self.cooldown}s")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self):
+        status = self.state
+        if self.state == "open":
+            remaining = max(0, self.cooldown - (time.monotonic() - self.opened_at))
+            status += f" (retry in {remaining:.0f}s)"
+        return (
+            f"{status}, {self.failures} consecutive failure(s), "
+            f"opened {self.times_opened} time(s), {self.rejected} request(s) failed fast"
+        )
+
+class TokenBucket:
+    """Async token-bucket rate limiter: rate tokens per second with bursts up to capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.waits = 0
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            self.waits += 1
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def stats(self):
+        return f"{self.rate:g} req/s, burst {self.capacity}, {self.tokens:.1f} tokens left, {self.waits} wait(s)"
+
+upstream_breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN)
+upstream_rate_limiter = TokenBucket(UPSTREAM_RATE_LIMIT, UPSTREAM_RATE_BURST)
+
+async def upstream_get(url: str, timeout: float, headers):
+    """
+    Performs one GET against the upstream and returns
+    (status, body, etag, last_modified, elapsed), elapsed excluding the rate limiter wait.
+    Every request passes the circuit breaker and the shared rate limiter.
+    """
+    is_probe = upstream_breaker.before_request()
+    try:
+        await upstream_rate_limiter.acquire()
+        session = get_upstream_session()
+        started = time.perf_counter()
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout), headers=headers) as response:
+            if response.status == 304:
+                body = None
+            else:
+                response.raise_for_status()
+                body = await response.read()
+            result = (
+                response.status, body, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                time.perf_counter() - started,
+            )
+    except asyncio.TimeoutError:
+        upstream_breaker.record_failure()
+        raise
+    except aiohttp.ClientResponseError as e:
+        # 4xx answers mean the host is up; only overload and server errors count against it
+        if e.status == 429 or e.status >= 500:
+            upstream_breaker.record_failure()
+        else:
+            upstream_breaker.record_success()
+        raise
+    except aiohttp.ClientError:
+        upstream_breaker.record_failure()
+        raise
+    except asyncio.CancelledError:
+        # A cancelled hedge or prefetch says nothing about upstream health
+        if is_probe:
+            upstream_breaker.release_probe()
+        raise
+    upstream_breaker.record_success()
+    return result
+
+async def hedged_upstream_get(url: str, timeout: float, headers, tracker=None):
+    """
+    Runs upstream_get, and when it has not answered within the observed p95 latency,
+    fires a second identical request and returns whichever succeeds first as
+    (status, body, etag, last_modified). Only the winning request's latency feeds tracker,
+    and only for full 200 responses (304 revalidations are not comparable downloads).
+    """
+    def winner(result):
+        status, body, etag, last_modified, elapsed = result
+        if tracker is not None and status == 200:
+            tracker.observe(elapsed)
+        return status, body, etag, last_modified
+
+    hedge_after = tracker.hedge_delay() if (UPSTREAM_HEDGING and tracker is not None) else None
+    primary = asyncio.create_task(upstream_get(url, timeout, headers))
+    if hedge_after is None or hedge_after >= timeout:
+        return winner(await primary)
+
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=hedge_after)
+        if not done:
+            logger.info(f"No answer from {url} after {hedge_after:.2f}s (p95); sending hedge request")
+            pending.add(asyncio.create_task(upstream_get(url, timeout - hedge_after, headers)))
+
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return winner(task.result())
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def fetch_upstream_json(url: str, timeout: float, headers=None, nid=None, tracker=None, decode=json.loads):
+    """
+    GET a JSON document from the upstream through the shared session and the on-disk
+    response cache. Fresh entries are served from disk; stale ones are revalidated
+    with If-None-Match/If-Modified-Since when the upstream supplied validators.
+    nid ties the entry to its test so its expiry can follow the test's schedule;
+    tracker (a LatencyTracker) enables hedging and records the observed latency.
+    decode turns the raw body into the returned data (the full body is what gets cached).
+    """
+    cache = get_response_cache()
+    cached = await asyncio.to_thread(cache.get, url)
+    if cached and cached["expires_at"] > time.time():
+        logger.info(f"Serving {url} from the response cache")
+        return decode(cached["body"])
+
+    request_headers = dict(headers or {})
+    if cached:
+        if cached["etag"]:
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            request_headers["If-Modified-Since"] = cached["last_modified"]
+
+    status, body, etag, last_modified = await hedged_upstream_get(url, timeout, request_headers, tracker)
+    if status == 304:
+        if not cached:
+            raise aiohttp.ClientError(f"Unexpected 304 Not Modified for {url}")
+        logger.info(f"Revalidated cached {url} (304 Not Modified)")
+        await asyncio.to_thread(cache.revalidated, url)
+        return decode(cached["body"])
+
+    data = decode(body)
+    # Empty answers (e.g. an unknown NID) are not cached so new tests show up immediately
+    if data:
+        await asyncio.to_thread(cache.put, url, body, etag, last_modified, nid)
+    return data
+
+# Background connectivity/upstream health monitoring
+HEALTH_CHECK_INTERVAL = 30
+HEALTH_STATE = {
+    "internet": True,  # Optimistic until the first probe completes
+    "upstream": True,
+    "internet_latency": None,
+    "upstream_latency": None,
+    "checked_at": None,
+}
+
+_health_monitor_task = None
+
+async def probe_internet(timeout=3):
+    """Returns the TCP connect time to Google DNS in seconds, or None when unreachable."""
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection("8.8.8.8", 53), timeout=timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.close()
+    return time.perf_counter() - started
+
+async def probe_upstream(timeout=10):
+    """Returns the response time of learn.aakashitutor.com in seconds, or None when unreachable."""
+    started = time.perf_counter()
+    try:
+        session = get_upstream_session()
+        async with session.head(UPSTREAM_BASE_URL, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            # Any HTTP answer below 500 means the host is up
+            if response.status >= 500:
+                return None
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return None
+    return time.perf_counter() - started
+
+async def check_health():
+    """Probes internet and upstream reachability once and updates HEALTH_STATE."""
+    internet_latency, upstream_latency = await asyncio.gather(probe_internet(), probe_upstream())
+    for key, latency in (("internet", internet_latency), ("upstream", upstream_latency)):
+        reachable = latency is not None
+        if reachable != HEALTH_STATE[key]:
+            log = logger.info if reachable else logger.warning
+            log(f"Health: {key} is now {'reachable' if reachable else 'unreachable'}")
+        HEALTH_STATE[key] = reachable
+        HEALTH_STATE[f"{key}_latency"] = latency
+    HEALTH_STATE["checked_at"] = time.time()
+
+async def run_health_monitor():
+    """Keeps HEALTH_STATE current by probing every HEALTH_CHECK_INTERVAL seconds."""
+    while True:
+        try:
+            await check_health()
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+def network_available() -> bool:
+    """Instant read of the cached health state: True if either probe target is reachable."""
+    return HEALTH_STATE["internet"] or HEALTH_STATE["upstream"]
+
+def health_summary() -> str:
+    """Short human-readable description of the cached health state."""
+    def describe(key):
+        if not HEALTH_STATE[key]:
+            return "unreachable"
+        latency = HEALTH_STATE[f"{key}_latency"]
+        return "reachable" if latency is None else f"reachable ({latency * 1000:.0f} ms)"
+
+    checked_at = HEALTH_STATE["checked_at"]
+    age = "never" if checked_at is None else f"{time.time() - checked_at:.0f}s ago"
+    return f"internet {describe('internet')}, upstream {describe('upstream')}, checked {age}"
+
+async def startup_resources(application=None) -> None:
+    """Starts background tasks and render workers (used as the application's post_init hook)."""
+    global _health_monitor_task
+    _health_monitor_task = asyncio.create_task(run_health_monitor())
+    warm_render_pool()
+
+async def shutdown_resources(application=None) -> None:
+    """Stops background tasks and releases the upstream session and caches (post_shutdown hook)."""
+    global _health_monitor_task
+    if _health_monitor_task is not None:
+        _health_monitor_task.cancel()
+        _health_monitor_task = None
+    shutdown_render_pool()
+    await close_upstream_session()
+    close_fragment_cache()
+    close_file_id_cache()
+    global _response_cache, _extraction_slots
+    _extraction_slots = None
+    if _response_cache is not None:
+        _response_cache.close()
+        _response_cache = None
+
+@dataclass(slots=True)
+class Option:
+    """One answer alternative: its raw HTML and whether it scores."""
+    answer: str
+    is_correct: bool
+
+@dataclass(slots=True)
+class Question:
+    """
+    The parts of a question that rendering and syllabus grouping read. Everything else
+    in the upstream object (hint, difficulty_level, bloom_taxonomy, ...) is left in the
+    cached payload and can be loaded on demand with details().
+    """
+    nid: str
+    qid: str
+    body: str
+    options: list
+    solution: str = ""
+    detailed_solution: str = ""
+    explanation: str = ""
+    subject_name: str = ""
+    chapter_name: str = ""
+    topic_name: str = ""
+
+    def details(self) -> dict:
+        """Loads the full upstream object for this question (see load_question_details)."""
+        return load_question_details(self.nid, self.qid)
+
+def questions_url(nid: str) -> str:
+    return f"{UPSTREAM_BASE_URL}/quiz/{nid}/getlocalequestions"
+
+def is_valid_question_object(data_obj):
+    return isinstance(data_obj, dict) and \
+           "body" in data_obj and \
+           "alternatives" in data_obj and \
+           isinstance(data_obj.get("alternatives"), list)
+
+def parse_option(alternative) -> Option:
+    if not isinstance(alternative, dict):
+        return Option("", False)
+    return Option(alternative.get("answer", ""), str(alternative.get("score_if_chosen")) == "1")
+
+def parse_question(nid: str, qid: str, english_version: dict) -> Question:
+    return Question(
+        nid=nid,
+        qid=str(qid),
+        body=english_version.get("body", ""),
+        options=[parse_option(alt) for alt in english_version.get("alternatives", [])],
+        solution=english_version.get("solution", ""),
+        detailed_solution=english_version.get("detailed_solution", ""),
+        explanation=english_version.get("explanation", ""),
+        # The fields below are crucial for syllabus extraction
+        subject_name=english_version.get("subject_name", ""),
+        chapter_name=english_version.get("chapter_name", ""),
+        topic_name=english_version.get("topic_name", ""),
+    )
+
+# getlocalequestions maps question NID -> {locale id: question object}; only English is used
+QUESTION_LOCALE = "843"
+JSON_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+json_value_decoder = json.JSONDecoder()
+
+def scan_json_object(doc: str, idx: int, on_member) -> int:
+    """
+    Walks the JSON object starting at doc[idx] member by member instead of decoding it
+    as a whole. on_member(key, value_idx) is called for each member and must return the
+    index just past that member's value. Returns the index just past the closing brace.
+    """
+    try:
+        idx = JSON_WHITESPACE_RE.match(doc, idx).end()
+        if doc[idx] != '{':
+            raise json.JSONDecodeError("Expecting '{'", doc, idx)
+        idx = JSON_WHITESPACE_RE.match(doc, idx + 1).end()
+        if doc[idx] == '}':
+            return idx + 1
+        while True:
+            if doc[idx] != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", doc, idx)
+            key, idx = json_value_decoder.raw_decode(doc, idx)
+            idx = JSON_WHITESPACE_RE.match(doc, idx).end()
+            if doc[idx] != ':':
+                raise json.JSONDecodeError("Expecting ':' delimiter", doc, idx)
+            idx = on_member(key, JSON_WHITESPACE_RE.match(doc, idx + 1).end())
+            idx = JSON_WHITESPACE_RE.match(doc, idx).end()
+            if doc[idx] == '}':
+                return idx + 1
+            if doc[idx] != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", doc, idx)
+            idx = JSON_WHITESPACE_RE.match(doc, idx + 1).end()
+    except IndexError:
+        raise json.JSONDecodeError("Unterminated object", doc, len(doc)) from None
+
+def decode_locale_questions(body, locale: str = QUESTION_LOCALE):
+    """
+    Decodes a getlocalequestions body one question at a time, keeping only the given
+    locale of each, so the other language variants of the whole test are never in
+    memory at once. Returns the same shape as json.loads would, minus the other
+    locales. Bodies that are not a JSON object are decoded as usual.
+    """
+    doc = body.decode(json.detect_encoding(body), "surrogatepass") if isinstance(body, (bytes, bytearray)) else body
+    start = JSON_WHITESPACE_RE.match(doc).end()
+    if not doc.startswith("{", start):
+        return json.loads(doc)
+
+    questions = {}
+
+    def on_question(qid, idx):
+        variants, end = json_value_decoder.raw_decode(doc, idx)
+        if isinstance(variants, dict):
+            questions[qid] = {locale: variants[locale]} if locale in variants else {}
+        return end
+
+    end = scan_json_object(doc, start, on_question)
+    if JSON_WHITESPACE_RE.match(doc, end).end() != len(doc):
+        raise json.JSONDecodeError("Extra data", doc, end)
+    return questions
+
+def parse_locale_questions(raw_data, nid: str = ""):
+    """Extracts the English (QUESTION_LOCALE) questions from a getlocalequestions payload."""
+    processed_questions = []
+
+    if isinstance(raw_data, dict):
+        for question_nid_key, question_data_by_language in raw_data.items():
+            if isinstance(question_data_by_language, dict):
+                english_version = question_data_by_language.get(QUESTION_LOCALE)
+                
+                if is_valid_question_object(english_version):
+                    processed_questions.append(parse_question(nid, question_nid_key, english_version))
+
+    return processed_questions
+
+def load_question_details(nid: str, qid: str) -> dict:
+    """
+    Returns the full English object for one question from the on-disk response cache,
+    or {} if the payload is no longer cached. Blocking; only meant for rare lookups.
+    """
+    cached = get_response_cache().get(questions_url(nid))
+    if cached is None:
+        return {}
+    try:
+        english_version = decode_locale_questions(cached["body"]).get(str(qid), {}).get(QUESTION_LOCALE)
+    except (ValueError, AttributeError):
+        return {}
+    return english_version if isinstance(english_version, dict) else {}
+
+async def fetch_locale_json_with_retries(nid: str):
     """Fetches question data from the API for a given NID with enhanced error handling."""
-    url = f"https://learn.aakashitutor.com/quiz/{nid}/getlocalequestions"
+    url = questions_url(nid)
     
     retry_configs = [
         {"timeout": 15, "headers": {}},
@@ -101,101 +869,274 @@ def fetch_locale_json_from_api(nid: str):
     
     for i, config in enumerate(retry_configs):
         try:
-            logger.info(f"Attempt {i+1} to fetch data for NID {nid}")
-            response = requests.get(url, timeout=config["timeout"], headers=config["headers"])
-            response.raise_for_status()
-            raw_data = response.json()
+            tracker = upstream_latency["questions"]
+            timeout = tracker.timeout_for(i, default=config["timeout"])
+            logger.info(f"Attempt {i+1} to fetch data for NID {nid} (timeout {timeout:.1f}s)")
+            raw_data = await fetch_upstream_json(
+                url, timeout=timeout, headers=config["headers"], nid=nid, tracker=tracker,
+                decode=decode_locale_questions,
+            )
             logger.info(f"Successfully fetched data for NID {nid} on attempt {i+1}")
 
-            processed_questions = []
-
-            def is_valid_question_object(data_obj):
-                return isinstance(data_obj, dict) and \
-                       "body" in data_obj and \
-                       "alternatives" in data_obj and \
-                       isinstance(data_obj.get("alternatives"), list)
-
-            if isinstance(raw_data, dict):
-                for question_nid_key, question_data_by_language in raw_data.items():
-                    if isinstance(question_data_by_language, dict):
-                        english_version = question_data_by_language.get("843")
-                        
-                        if is_valid_question_object(english_version):
-                            # The fields here are crucial for syllabus extraction
-                            question_data = {
-                                "body": english_version.get("body", ""),
-                                "alternatives": english_version.get("alternatives", []),
-                                "hint": english_version.get("hint", ""),
-                                "solution": english_version.get("solution", ""),
-                                "detailed_solution": english_version.get("detailed_solution", ""),
-                                "explanation": english_version.get("explanation", ""),
-                                "chapter": english_version.get("chapter", ""),
-                                "chapter_name": english_version.get("chapter_name", ""),
-                                "subject": english_version.get("subject", ""),
-                                "subject_name": english_version.get("subject_name", ""), # Used for syllabus grouping
-                                "topic": english_version.get("topic", ""),
-                                "topic_name": english_version.get("topic_name", ""), # Used for syllabus grouping
-                                "subtopic": english_version.get("subtopic", ""),
-                                "subtopic_name": english_version.get("subtopic_name", ""),
-                                "difficulty_level": english_version.get("difficulty_level", ""),
-                                "bloom_taxonomy": english_version.get("bloom_taxonomy", ""),
-                                "question_type": english_version.get("question_type", ""),
-                            }
-                            processed_questions.append(question_data)
-
+            processed_questions = parse_locale_questions(raw_data, nid)
             if processed_questions:
                 return processed_questions
                 
-        except requests.exceptions.ConnectionError as e:
+        except CircuitOpenError as e:
+            logger.warning(f"Not fetching data for NID {nid}: {e}")
+            break
+        except aiohttp.ClientConnectionError as e:
             logger.error(f"Connection error on attempt {i+1} for NID {nid}: {e}")
             if i < len(retry_configs) - 1:
-                time.sleep(2 ** i)
-        except requests.exceptions.Timeout as e:
+                await asyncio.sleep(2 ** i)
+        except asyncio.TimeoutError as e:
             logger.error(f"Timeout on attempt {i+1} for NID {nid}: {e}")
             if i < len(retry_configs) - 1:
-                time.sleep(2 ** i)
-        except requests.exceptions.RequestException as e:
+                await asyncio.sleep(2 ** i)
+        except aiohttp.ClientError as e:
             logger.error(f"Request error on attempt {i+1} for NID {nid}: {e}")
             if i < len(retry_configs) - 1:
-                time.sleep(2 ** i)
+                await asyncio.sleep(2 ** i)
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error on attempt {i+1} for NID {nid}: {e}")
             break
         except Exception as e:
             logger.error(f"Unexpected error on attempt {i+1} for NID {nid}: {e}")
             if i < len(retry_configs) - 1:
-                time.sleep(2 ** i)
+                await asyncio.sleep(2 ** i)
 
     logger.error(f"All attempts failed for NID {nid}")
     return None
 
-def fetch_test_metadata(nid: str):
+async def fetch_test_metadata_with_retries(nid: str):
     """
     Fetches the full test metadata (title, description, syllabus) 
     from the getquizfromid API.
     """
     # This is the correct API endpoint for test metadata
-    url = f"https://learn.aakashitutor.com/api/getquizfromid?nid={nid}"
+    url = f"{UPSTREAM_BASE_URL}/api/getquizfromid?nid={nid}"
     
     for attempt in range(3):
         try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            tracker = upstream_latency["metadata"]
+            data = await fetch_upstream_json(
+                url, timeout=tracker.timeout_for(attempt, default=15), nid=nid, tracker=tracker
+            )
             if isinstance(data, list) and data:
+                # Cached responses for this test expire according to its schedule
+                await asyncio.to_thread(get_response_cache().update_schedule, nid, data[0])
                 # Returns the full metadata object which contains title, description, syllabus, etc.
                 return data[0] 
             return None
+        except CircuitOpenError as e:
+            logger.warning(f"Not fetching metadata for NID {nid}: {e}")
+            break
         except Exception as e:
             logger.error(f"Error fetching metadata on attempt {attempt+1} for NID {nid}: {e}")
             if attempt < 2:
-                time.sleep(2)
+                await asyncio.sleep(2)
     
     return None
 
+# In-flight upstream fetches keyed by (kind, nid), shared by concurrent callers
+_inflight_fetches = {}
+COALESCE_STATS = {"fetches": 0, "deduplicated": 0}
+
+async def single_flight(key, coro_factory):
+    """
+    Runs coro_factory() at most once at a time per key. Concurrent callers with the
+    same key await the already running fetch instead of starting a duplicate. The fetch
+    is cancelled once every caller waiting on it has been cancelled.
+    """
+    entry = _inflight_fetches.get(key)
+    if entry is None:
+        task = asyncio.create_task(coro_factory())
+        entry = {"task": task, "waiters": 0, "active": 0}
+        _inflight_fetches[key] = entry
+
+        def forget(finished_task, key=key, entry=entry):
+            if _inflight_fetches.get(key) is entry:
+                del _inflight_fetches[key]
+            if entry["waiters"]:
+                logger.info(f"Fetch {key} served {entry['waiters']} deduplicated request(s)")
+
+        task.add_done_callback(forget)
+        COALESCE_STATS["fetches"] += 1
+    else:
+        entry["waiters"] += 1
+        COALESCE_STATS["deduplicated"] += 1
+        logger.info(f"Joining in-flight fetch {key} ({entry['waiters']} waiting)")
+
+    # Shielded so that one caller giving up (e.g. a cancelled prefetch) does not cancel the others
+    entry["active"] += 1
+    try:
+        return await asyncio.shield(entry["task"])
+    finally:
+        entry["active"] -= 1
+        if not entry["active"] and not entry["task"].done():
+            # Nobody is left waiting: stop the fetch (and its retries) and let new callers start afresh
+            if _inflight_fetches.get(key) is entry:
+                del _inflight_fetches[key]
+            entry["task"].cancel()
+            logger.info(f"Cancelled fetch {key}: no callers left")
+
+async def fetch_locale_json_from_api(nid: str):
+    """Fetches question data for a NID, sharing one upstream fetch between concurrent callers."""
+    return await single_flight(("questions", nid), lambda: fetch_locale_json_with_retries(nid))
+
+# Per-NID metadata and its pre-rendered /info message, shared by /info and extraction
+INFO_CACHE_SIZE = 256
+INFO_CACHE_TTL = 300  # Upper bound; entries also expire at the test's close/results time
+metadata_cache = LRUCache(INFO_CACHE_SIZE)
+
+async def fetch_metadata_entry(nid: str):
+    """
+    Returns the metadata cache entry for a NID ({"metadata", "message"}), fetching from
+    the upstream (one fetch shared between concurrent callers) on a miss, or None.
+    """
+    entry = metadata_cache.get(nid)
+    if entry is not None:
+        return entry
+
+    metadata = await single_flight(("metadata", nid), lambda: fetch_test_metadata_with_retries(nid))
+    if not metadata:
+        return None
+
+    fetched_at = time.time()
+    expires_at = min(
+        cache_expiry(
+            fetched_at,
+            parse_timestamp(metadata.get("quiz_open")),
+            parse_timestamp(metadata.get("quiz_close")),
+            parse_timestamp(metadata.get("show_results")),
+            ttl=INFO_CACHE_TTL,
+        ),
+        fetched_at + INFO_CACHE_TTL,
+    )
+    entry = {"metadata": metadata, "message": None}
+    metadata_cache.set(nid, entry, expires_at=expires_at)
+    return entry
+
+async def fetch_test_metadata(nid: str):
+    """Fetches test metadata for a NID from the in-memory cache or the upstream."""
+    entry = await fetch_metadata_entry(nid)
+    return entry["metadata"] if entry else None
+
 async def fetch_quiz_info(nid):
-    """Fetch quiz information for info command - calls fetch_test_metadata internally"""
-    return fetch_test_metadata(nid)
+    """Returns the formatted /info message for a NID (rendered once per cache entry), or None."""
+    entry = await fetch_metadata_entry(nid)
+    if entry is None:
+        return None
+    if entry["message"] is None:
+        entry["message"] = format_quiz_info(entry["metadata"])
+    return entry["message"]
+
+# How long the extraction waits for metadata once the questions have arrived
+METADATA_GRACE_SECONDS = 5
+
+async def timed_stage(timings, stage, coro):
+    """Awaits coro and records its wall time (seconds) under timings[stage]."""
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[stage] = time.perf_counter() - started
+
+def log_stage_timings(nid, timings):
+    """Logs the per-stage timings collected for an extraction."""
+    stages = " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+    logger.info(f"Extraction timings for NID {nid}: {stages}")
+
+async def fetch_extraction_data(nid: str, timings=None):
+    """
+    Fetches test metadata and question data concurrently.
+    The metadata is optional: if it fails, or is still pending METADATA_GRACE_SECONDS
+    after the questions arrive, the extraction continues without it.
+    Returns a (metadata, questions) tuple.
+    """
+    if timings is None:
+        timings = {}
+
+    metadata_task = asyncio.create_task(timed_stage(timings, "metadata", fetch_test_metadata(nid)))
+    try:
+        data = await timed_stage(timings, "questions", fetch_locale_json_from_api(nid))
+        if not data:
+            return None, data
+
+        try:
+            test_metadata = await asyncio.wait_for(asyncio.shield(metadata_task), timeout=METADATA_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Metadata for NID {nid} still pending after questions arrived; continuing without it")
+            test_metadata = None
+        except Exception as e:
+            logger.error(f"Metadata fetch failed for NID {nid}: {e}")
+            test_metadata = None
+        return test_metadata, data
+    finally:
+        if not metadata_task.done():
+            metadata_task.cancel()
+
+# Seconds a prefetch (and the questions it holds) is kept for a user who never picks a format
+PREFETCH_TTL = 300
+
+def start_prefetch(context: ContextTypes.DEFAULT_TYPE, nid: str) -> None:
+    """
+    Starts fetching the extraction data for nid in the background and attaches it to the
+    user's session, replacing (and cancelling) any prefetch for a previous NID. The entry
+    is dropped after PREFETCH_TTL if nobody claims it.
+    """
+    cancel_prefetch(context)
+    timings = {}
+    task = context.application.create_task(fetch_extraction_data(nid, timings))
+    prefetch = {"nid": nid, "task": task, "timings": timings}
+    prefetch["expiry"] = asyncio.get_running_loop().call_later(
+        PREFETCH_TTL, expire_prefetch, context.user_data, prefetch
+    )
+    context.user_data['prefetch'] = prefetch
+    logger.info(f"Started prefetch for NID {nid}")
+
+def expire_prefetch(user_data, prefetch) -> None:
+    """Drops an unclaimed prefetch so its question list does not live on in user_data."""
+    if user_data.get('prefetch') is prefetch:
+        user_data.pop('prefetch', None)
+        if not prefetch["task"].done():
+            prefetch["task"].cancel()
+        logger.info(f"Dropped unclaimed prefetch for NID {prefetch['nid']}")
+
+def pop_prefetch(context: ContextTypes.DEFAULT_TYPE):
+    """Detaches the user's prefetch (if any) from the session and returns it."""
+    prefetch = context.user_data.pop('prefetch', None)
+    if prefetch:
+        prefetch["expiry"].cancel()
+    return prefetch
+
+def cancel_prefetch(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancels and drops the user's pending prefetch, if any."""
+    prefetch = pop_prefetch(context)
+    if prefetch and not prefetch["task"].done():
+        prefetch["task"].cancel()
+        logger.info(f"Cancelled prefetch for NID {prefetch['nid']}")
+
+async def get_extraction_data(prefetch, nid: str, timings):
+    """
+    Returns the (metadata, questions) tuple for nid, reusing prefetch (an entry detached
+    from the session with pop_prefetch, or None) when it was started for the same NID.
+    """
+    if not prefetch or prefetch["nid"] != nid:
+        if prefetch and not prefetch["task"].done():
+            prefetch["task"].cancel()
+        return await fetch_extraction_data(nid, timings)
+
+    task = prefetch["task"]
+    if task.cancelled():
+        return await fetch_extraction_data(nid, timings)
+
+    logger.info(f"Using prefetch for NID {nid} ({'ready' if task.done() else 'still in flight'})")
+    try:
+        return await task
+    finally:
+        for stage, seconds in prefetch["timings"].items():
+            timings.setdefault(stage, seconds)
 
 def format_timestamp(timestamp):
     """Convert timestamp to readable date format"""
@@ -207,6 +1148,46 @@ def format_timestamp(timestamp):
     except:
         return "N/A"
 
+# Memoization of fragment processing, keyed by a hash of the fragment's content
+FRAGMENT_MEMO_SIZE = int(os.environ.get("FRAGMENT_MEMO_SIZE", 8192))
+solution_content_memo = LRUCache(FRAGMENT_MEMO_SIZE)
+html_content_memo = LRUCache(FRAGMENT_MEMO_SIZE)
+
+def fragment_key(fragment: str) -> bytes:
+    """Compact content hash used as the memo key (the fragment itself is not kept)."""
+    return hashlib.blake2b(fragment.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+def memoize_fragments(memo):
+    """
+    Decorator for str -> str fragment functions: repeated fragments (e.g. "Both (1) and (2)",
+    units, shared diagrams) are answered from memo instead of being processed again.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(fragment):
+            if not isinstance(fragment, str) or not fragment:
+                return func(fragment)
+            key = fragment_key(fragment)
+            result = memo.get(key)
+            if result is None:
+                result = func(fragment)
+                memo.set(key, result)
+            return result
+        return wrapper
+    return decorator
+
+def fragment_memo_stats() -> str:
+    """Hit/miss summary of the fragment memos in this process."""
+    return f"process_html_content {html_content_memo.stats()}; clean_solution_content {solution_content_memo.stats()}"
+
+def fragment_memo_counters() -> dict:
+    """{memo name: (entries, hits, misses)} for the fragment memos in this process."""
+    return {
+        name: (len(memo), memo.hits, memo.misses)
+        for name, memo in (("process_html_content", html_content_memo), ("clean_solution_content", solution_content_memo))
+    }
+
+@memoize_fragments(solution_content_memo)
 def clean_solution_content(content: str) -> str:
     """
     Cleans solution content by removing NID numbers, JSON-like artifacts, 
@@ -218,21 +1199,108 @@ def clean_solution_content(content: str) -> str:
     content_str = str(content)
     
     # 1. Remove JSON artifacts
-    content_str = re.sub(r'\{[\'"]nid[\'"]:\s*[\'"][0-9]+[\'"],\s*[\'"]content[\'"]:\s*[\'"]', '', content_str)
-    content_str = re.sub(r',\s*[\'"]clipping_nid[\'"]:\s*None,\s*[\'"]type[\'"]:\s*[\'"]HTML5[\'"],\s*[\'"]duration[\'"]:\s*None\}.*?$', '', content_str)
-    content_str = re.sub(r'\{[^}]*\}', '', content_str)
+    if '{' in content_str:
+        content_str = SOLUTION_JSON_HEAD_RE.sub('', content_str)
+    if '}' in content_str:
+        content_str = SOLUTION_JSON_TAIL_RE.sub('', content_str)
+    if '{' in content_str:
+        content_str = BRACED_ARTIFACT_RE.sub('', content_str)
     
-    # 2. AGGRESSIVE ESCAPED LINE BREAK CLEANUP 
-    content_str = content_str.replace('\\r\\n', ' ').replace('\\r', ' ').replace('\\n', ' ')
+    # 2. AGGRESSIVE ESCAPED LINE BREAK CLEANUP (\r\n, \r and \n in one pass)
+    if '\\' in content_str:
+        content_str = ESCAPED_LINE_BREAK_RE.sub(' ', content_str)
     
     content_str = content_str.strip('\'"')
     content_str = content_str.strip()
     
     return content_str
 
+# HTML sanitization engine: BeautifulSoup's html.parser by default, lxml (faster) on request
+SANITIZER_BACKEND = os.environ.get("SANITIZER_BACKEND", "html.parser")
+if SANITIZER_BACKEND == "lxml" and lxml_html is None:
+    logger.warning("lxml is not installed; falling back to the html.parser sanitizer")
+    SANITIZER_BACKEND = "html.parser"
+
+SUB_SUP_STYLE = 'font-size: 0.85em; line-height: 1;'
+
+def is_plain_text(fragment: str) -> bool:
+    """True when a fragment has no tags or entities, so parsing it cannot change anything."""
+    return '<' not in fragment and '&' not in fragment
+
+def rewrite_fragment_with_html_parser(html_str: str) -> str:
+    """rewrite_html_fragment implemented with BeautifulSoup and html.parser."""
+    soup = BeautifulSoup(html_str, 'html.parser')
+    
+    # Drop <html>/<body> wrappers around the content (lxml's fragment parser does the same)
+    for tag in soup.find_all(['html', 'body']):
+        tag.unwrap()
+
+    # Fixing relative image paths
+    for img_tag in soup.find_all('img'):
+        src = img_tag.get('src')
+        if src and src.startswith('//'):
+            img_tag['src'] = f"https:{src}"
+    
+    # Styling for subscripts/superscripts
+    for element in soup.find_all(['sub', 'sup']):
+        element['style'] = SUB_SUP_STYLE
+    
+    return str(soup)
+
+def rewrite_fragment_with_lxml(html_str: str) -> str:
+    """rewrite_html_fragment implemented with lxml.html (about 9x faster than html.parser)."""
+    container = lxml_html.fragment_fromstring(html_str, create_parent="div")
+
+    for img_tag in container.iter('img'):
+        src = img_tag.get('src')
+        if src and src.startswith('//'):
+            img_tag.set('src', f"https:{src}")
+
+    for element in container.iter('sub', 'sup'):
+        element.set('style', SUB_SUP_STYLE)
+
+    # Serialize the children only: strip the "<div>" ... "</div>" container
+    return lxml_html.tostring(container, encoding='unicode')[len("<div>"):-len("</div>")]
+
+def lxml_keeps_fragment(html_str: str) -> bool:
+    """False for fragments lxml would lose content from (see rewrite_html_fragment)."""
+    # lxml also stops at NUL characters
+    if '\x00' in html_str or HEAD_CONTENT_RE.search(html_str):
+        return False
+    # Conservative: any inline tag opened before a block tag counts as wrapping it
+    inline = INLINE_OPEN_TAG_RE.search(html_str)
+    return not inline or not BLOCK_OPEN_TAG_RE.search(html_str, inline.end())
+
+def rewrite_html_fragment(html_str: str, backend=None) -> str:
+    """
+    Parses an HTML fragment, makes protocol-relative image URLs absolute and styles
+    <sub>/<sup>, returning the re-serialized fragment. Plain-text fragments skip parsing.
+    backend is "lxml" or "html.parser" (default SANITIZER_BACKEND). Fragments lxml
+    would rewrite go through html.parser even when lxml is selected: lxml empties
+    inline tags that wrap blocks (<b><p>x</p></b> becomes <b></b><p>x</p>) and drops
+    <title>/<style>/<meta> outside a <head>. Otherwise both produce the same tree (see
+    tests/test_sanitizer_backends.py), except that lxml serializes void elements as
+    <br> rather than <br/>, drops <!DOCTYPE> declarations, ends a paragraph at a block
+    it contains (<p>a<table>) and avoids html.parser's habit of turning a <br>
+    followed by a <br/> into <br>...</br>.
+    """
+    if is_plain_text(html_str):
+        # Both parsers would return the text unchanged apart from escaping '>'
+        return html_str.replace('>', '&gt;')
+
+    backend = backend or SANITIZER_BACKEND
+    if backend == "lxml" and lxml_keeps_fragment(html_str):
+        try:
+            return rewrite_fragment_with_lxml(html_str)
+        except (lxml_etree.ParserError, ValueError) as e:
+            logger.warning(f"lxml could not parse fragment, using html.parser: {e}")
+    return rewrite_fragment_with_html_parser(html_str)
+
+@memoize_fragments(html_content_memo)
 def process_html_content(html_string: str) -> str:
     """
-    Processes HTML content with aggressive line break removal and BeautifulSoup parsing.
+    Processes HTML content with aggressive line break removal and HTML parsing
+    (see rewrite_html_fragment for the parser backends).
     """
     if not html_string or html_string is None:
         return ""
@@ -242,25 +1310,16 @@ def process_html_content(html_string: str) -> str:
         html_str = str(cleaned_content)
         
         # --- FINAL AGGRESSIVE FIX FOR R/N/R/N ERROR ---
-        html_str = html_str.replace('\r', '') 
-        html_str = re.sub(r'\n+', ' ', html_str)
-        html_str = html_str.replace('r/n/r/n', ' ').replace('r/n', ' ') 
+        # '\r' goes first: it can split an 'r/n'
+        html_str = html_str.replace('\r', '')
+        if '\n' in html_str:
+            html_str = NEWLINE_RUN_RE.sub(' ', html_str)
+        if 'r/n' in html_str:
+            html_str = html_str.replace('r/n/r/n', ' ').replace('r/n', ' ')
         # -----------------------------------------------
 
-        # Use BeautifulSoup to parse and clean the HTML structure
-        soup = BeautifulSoup(html_str, 'html.parser')
-        
-        # Fixing relative image paths
-        for img_tag in soup.find_all('img'):
-            src = img_tag.get('src')
-            if src and src.startswith('//'):
-                img_tag['src'] = f"https:{src}"
-        
-        # Styling for subscripts/superscripts
-        for element in soup.find_all(['sub', 'sup']):
-            element['style'] = 'font-size: 0.85em; line-height: 1;'
-        
-        content = str(soup)
+        # Parse and clean the HTML structure (fixes image paths, styles sub/sup)
+        content = rewrite_html_fragment(html_str)
         
         # Specific replacements
         content = content.replace('P<sub>s</sub>', '<span style="font-size: 18px;">P<sub style="font-size: 14px;">s</sub></span>')
@@ -271,32 +1330,54 @@ def process_html_content(html_string: str) -> str:
         logger.error(f"Error processing HTML content: {e}")
         return str(html_string)
 
+# Syllabus subjects in display order, each with the substrings of upstream subject names
+# that map to it. The first match wins, so more specific subjects should come first.
+SUBJECT_CLASSIFIER = [
+    ("Physics", ("Physics",)),
+    ("Chemistry", ("Chemistry",)),
+    ("Botany", ("Botany",)),
+    ("Zoology", ("Zoology",)),
+    ("Mathematics", ("Mathematics", "Maths", "Math")),  # JEE tests
+]
+SYLLABUS_TAG_RE = re.compile(r'<[A-Za-z/!?][^>]*>')
+
+@functools.lru_cache(maxsize=1024)
+def classify_subject(subject_name: str):
+    """Returns the SUBJECT_CLASSIFIER subject for an upstream subject name, or None."""
+    for subject, keywords in SUBJECT_CLASSIFIER:
+        if any(keyword in subject_name for keyword in keywords):
+            return subject
+    return None
+
+@functools.lru_cache(maxsize=4096)
+def topic_text(topic: str) -> str:
+    """Text of a chapter/topic name: tags stripped and entities decoded, without an HTML parser."""
+    if '<' in topic:
+        topic = SYLLABUS_TAG_RE.sub('', topic)
+    if '&' in topic:
+        topic = html_unescape(topic)
+    return topic.strip()
+
 def group_syllabus_topics(question_data_list):
     """
-    Analyzes question data to extract and format syllabus topics by subject 
-    into a structured dictionary (Physics, Chemistry, Botany, Zoology).
+    Analyzes question data to extract and format syllabus topics by subject
+    into a structured dictionary (see SUBJECT_CLASSIFIER).
     """
-    syllabus_map = {
-        "Physics": set(),
-        "Chemistry": set(),
-        "Botany": set(),
-        "Zoology": set(),
-    }
+    syllabus_map = {subject: set() for subject, _ in SUBJECT_CLASSIFIER}
+    seen = set()
     
     for q in question_data_list:
-        subject_name = str(q.get("subject_name", "")).strip()
-        chapter_name = str(q.get("chapter_name", "")).strip()
-        topic_name = str(q.get("topic_name", "")).strip()
+        # Most questions of a test share their subject/chapter/topic with another one
+        names = (q.subject_name, q.chapter_name, q.topic_name)
+        if names in seen:
+            continue
+        seen.add(names)
+
+        subject_name = str(q.subject_name).strip()
+        chapter_name = str(q.chapter_name).strip()
+        topic_name = str(q.topic_name).strip()
         
-        subject_key = None
-        if "Physics" in subject_name:
-            subject_key = "Physics"
-        elif "Chemistry" in subject_name:
-            subject_key = "Chemistry"
-        elif "Botany" in subject_name:
-            subject_key = "Botany"
-        elif "Zoology" in subject_name:
-            subject_key = "Zoology"
+        subject_key = classify_subject(subject_name)
             
         if subject_key:
             # Create a combined entry: Chapter - Topic
@@ -321,38 +1402,36 @@ def generate_syllabus_html_box(metadata_object, question_data_list):
     has_structured_syllabus = any(topic_map.values())
     
     if has_structured_syllabus:
-        html = """
+        parts = ["""
         <div class='syllabus-container'>
             <div class='syllabus-header'>
                 <h2> Structured Test Syllabus (Topics Covered by Questions)</h2>
             </div>
             <div class='syllabus-subjects'>
-        """
+        """]
         
-        subject_order = ["Physics", "Chemistry", "Botany", "Zoology"]
-        
-        for subject in subject_order:
-            topics = sorted(list(topic_map[subject]))
+        for subject, _ in SUBJECT_CLASSIFIER:
+            topics = sorted(topic_map[subject])
             if topics:
-                html += f"""
+                parts.append(f"""
                 <div class='subject-box'>
                     <h3>{subject}</h3>
                     <ul>
-                """
+                """)
                 for topic in topics:
-                    cleaned_topic = BeautifulSoup(topic, 'html.parser').get_text().strip()
+                    cleaned_topic = topic_text(topic)
                     if cleaned_topic:
-                        html += f"<li>{cleaned_topic}</li>"
-                html += """
+                        parts.append(f"<li>{cleaned_topic}</li>")
+                parts.append("""
                     </ul>
                 </div>
-                """
+                """)
                 
-        html += """
+        parts.append("""
             </div>
         </div>
-        """
-        return html
+        """)
+        return "".join(parts)
     
     # 2. Fallback to raw metadata syllabus/description
     if not metadata_object:
@@ -366,16 +1445,8 @@ def generate_syllabus_html_box(metadata_object, question_data_list):
     if not syllabus_content_raw:
         return ""
     
-    # Process the raw content
-    try:
-        soup = BeautifulSoup(syllabus_content_raw, 'html.parser')
-        # Unwrap <html> and <body> tags if they wrap the content
-        for tag in soup.find_all(['html', 'body']):
-            tag.unwrap()
-        syllabus_body_html = process_html_content(str(soup))
-    except Exception as e:
-        logger.error(f"Error processing syllabus HTML with BeautifulSoup: {e}")
-        syllabus_body_html = process_html_content(syllabus_content_raw) 
+    # Process the raw content (the sanitizer also unwraps <html> and <body> tags wrapping it)
+    syllabus_body_html = process_html_content(syllabus_content_raw)
 
     html = f"""
     <div class='syllabus-container raw-metadata'>
@@ -389,23 +1460,38 @@ def generate_syllabus_html_box(metadata_object, question_data_list):
     """
     return html
 
-# Theme 1: Questions Only (No answers shown)
-def generate_questions_only_html(data, test_title, syllabus_html=""):
-    """Generate HTML with only questions and options (no correct answers marked)"""
-    html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset='UTF-8'>
-<title>{test_title}</title>
-<style>
-    * {{
+# Syllabus boxes per NID; an entry is reused while the test's syllabus inputs are unchanged
+syllabus_box_cache = LRUCache(INFO_CACHE_SIZE, ttl=INFO_CACHE_TTL)
+
+def get_syllabus_html(nid: str, metadata_object, question_data_list) -> str:
+    """
+    generate_syllabus_html_box, memoized per NID. The entry is keyed on a hash of
+    everything the box is built from (the distinct subject/chapter/topic triples and the
+    metadata syllabus/description) and expires at the latest after INFO_CACHE_TTL.
+    """
+    names = {(q.subject_name, q.chapter_name, q.topic_name) for q in question_data_list}
+    fingerprint = fragment_key(repr((
+        sorted(map(repr, names)),
+        metadata_object.get('syllabus') if metadata_object else None,
+        metadata_object.get('description') if metadata_object else None,
+    )))
+
+    entry = syllabus_box_cache.get(nid)
+    if entry and entry[0] == fingerprint:
+        return entry[1]
+    syllabus_html = generate_syllabus_html_box(metadata_object, question_data_list)
+    syllabus_box_cache.set(nid, (fingerprint, syllabus_html))
+    return syllabus_html
+
+# Stylesheets for the generated documents, built once at import instead of on every call
+QUESTIONS_ONLY_STYLE = """
+    * {
         margin: 0;
         padding: 0;
         box-sizing: border-box;
-    }}
+    }
     
-    body {{
+    body {
         font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
         background-color: #ffffff;
         color: #333333;
@@ -414,9 +1500,9 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         max-width: 1200px;
         margin: 0 auto;
         position: relative;
-    }}
+    }
     
-    .header {{
+    .header {
         text-align: center;
         background: linear-gradient(135deg, #e8f5e8, #f0f9f0);
         color: #2d5a2d;
@@ -427,15 +1513,15 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         border: 2px solid #c3e6c3;
         position: relative;
         z-index: 2;
-    }}
+    }
     
-    .header h1 {{
+    .header h1 {
         font-size: 32px;
         font-weight: bold;
-    }}
+    }
     
     /* --- SYLLABUS BOX STYLES (REQUIRED FOR ALL) --- */
-    .syllabus-container {{
+    .syllabus-container {
         border: 2px solid #ced4da;
         border-radius: 12px;
         padding: 20px;
@@ -443,9 +1529,9 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         background-color: #f8f9fa;
         box-shadow: 0 4px 12px rgba(0,0,0,0.05);
         page-break-inside: avoid;
-    }}
+    }
     
-    .syllabus-header h2 {{
+    .syllabus-header h2 {
         font-size: 24px;
         color: #2196f3;
         border-bottom: 3px solid #2196f3;
@@ -456,37 +1542,37 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         display: flex;
         align-items: center;
         gap: 10px;
-    }}
+    }
     
-    .syllabus-content {{
+    .syllabus-content {
         display: block;
         width: 100%;
         background-color: #ffffff;
         padding: 20px;
         border-radius: 8px;
         border: 1px solid #e0e0e0;
-    }}
+    }
     
-    .subject-line {{
+    .subject-line {
         margin-bottom: 15px;
         font-size: 16px;
         line-height: 1.6;
-    }}
+    }
     
-    .subject-name {{
+    .subject-name {
         font-weight: bold;
         color: #2d5a2d;
         display: inline-block;
         min-width: 80px;
-    }}
+    }
     
-    .subject-topics {{
+    .subject-topics {
         color: #424242;
         margin-left: 10px;
-    }}
+    }
     /* --- END SYLLABUS BOX STYLES --- */
     
-    .question-container {{
+    .question-container {
         background-color: #ffffff;
         border: 2px solid #e9ecef;
         border-radius: 12px;
@@ -496,9 +1582,9 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         box-shadow: 0 2px 10px rgba(0,0,0,0.05);
         position: relative;
         z-index: 2;
-    }}
+    }
     
-    .question-watermark {{
+    .question-watermark {
         position: absolute;
         top: 15px;
         right: 20px;
@@ -518,22 +1604,22 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         box-shadow: 0 2px 8px rgba(102, 205, 170, 0.2);
         text-decoration: none;
         transition: all 0.3s ease;
-    }}
+    }
     
-    .question-watermark:hover {{
+    .question-watermark:hover {
         background: linear-gradient(135deg, rgba(173, 216, 230, 0.35), rgba(144, 238, 144, 0.35));
         border-color: rgba(102, 205, 170, 0.6);
         color: rgba(72, 139, 139, 1);
         transform: scale(1.05);
-    }}
+    }
     
-    .question-header {{
+    .question-header {
         display: flex;
         align-items: center;
         margin-bottom: 20px;
-    }}
+    }
     
-    .question-number {{
+    .question-number {
         background: linear-gradient(135deg, #66cdaa, #48a999);
         color: white;
         min-width: 120px;
@@ -546,24 +1632,24 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         font-size: 16px;
         box-shadow: 0 2px 8px rgba(102, 205, 170, 0.3);
         padding: 0 15px;
-    }}
+    }
     
-    .question-text {{
+    .question-text {
         padding: 20px 0;
         margin-bottom: 20px;
         font-size: 18px;
         line-height: 1.7;
         font-weight: 500;
         color: #2d2d2d;
-    }}
+    }
     
-    .options {{
+    .options {
         display: grid;
         grid-template-columns: 1fr 1fr;
         gap: 15px;
-    }}
+    }
     
-    .option {{
+    .option {
         background-color: #f8f9fa;
         border: 2px solid #dee2e6;
         border-radius: 8px;
@@ -573,9 +1659,9 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         align-items: flex-start;
         gap: 12px;
         transition: all 0.2s ease;
-    }}
+    }
     
-    .option-label {{
+    .option-label {
         background-color: #6c757d;
         color: white;
         width: 28px;
@@ -587,100 +1673,44 @@ def generate_questions_only_html(data, test_title, syllabus_html=""):
         font-weight: bold;
         font-size: 14px;
         flex-shrink: 0;
-    }}
+    }
     
-    @media (max-width: 768px) {{
-        .options {{
+    @media (max-width: 768px) {
+        .options {
             grid-template-columns: 1fr;
-        }}
+        }
         
-        .syllabus-content {{
+        .syllabus-content {
             width: 100%;
-        }}
+        }
         
-        body {{
+        body {
             padding: 15px;
-        }}
+        }
         
-        .question-header {{
+        .question-header {
             flex-direction: column;
             align-items: flex-start;
-        }}
+        }
         
-        .question-watermark {{
+        .question-watermark {
             top: 12px;
             right: 15px;
             padding: 6px 12px;
             font-size: 12px;
             letter-spacing: 0.5px;
-        }}
-    }}
-</style>
-</head>
-<body>
-    <div class='header'>
-        <h1>{test_title} - Questions Only</h1>
-    </div>
-    {syllabus_html}
-    """
-    
-    for idx, q in enumerate(data, 1):
-        processed_body = process_html_content(q['body'])
-        
-        html += f"""
-    <div class='question-container'>
-        <a href='https://t.me/NEETSQUARE' target='_blank' class='question-watermark'>NEETSQUARE</a>
-        <div class='question-header'>
-            <div class='question-number'>Question {idx}</div>
-        </div>
-        <div class='question-text'>{processed_body}</div>
-        <div class='options'>
-        """
-        
-        # Process options (no correct answer marking)
-        alternatives = q["alternatives"][:4]
-        labels = ["A", "B", "C", "D"]
-        
-        for opt_idx, opt in enumerate(alternatives):
-            if opt_idx < len(labels):
-                label = labels[opt_idx]
-                processed_answer = process_html_content(opt['answer'])
-                html += f"""
-            <div class='option'>
-                <div class='option-label'>{label}</div>
-                <div class='option-text'>{processed_answer}</div>
-            </div>
-                """
-        
-        html += """
-        </div>
-    </div>
-        """
-    
-    html += """
-</body>
-</html>
-    """
-    
-    return html
+        }
+    }
+"""  # Theme 1
 
-# Theme 2.1: Questions with Marked Correct Answers (NO solutions)
-def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
-    """Generate HTML with questions and marked correct answers (NO solutions)"""
-    html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset='UTF-8'>
-<title>{test_title}</title>
-<style>
-    * {{
+QUESTIONS_ANSWERS_STYLE = """
+    * {
         margin: 0;
         padding: 0;
         box-sizing: border-box;
-    }}
+    }
     
-    body {{
+    body {
         font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
         background-color: #ffffff;
         color: #333333;
@@ -689,9 +1719,9 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         max-width: 1200px;
         margin: 0 auto;
         position: relative;
-    }}
+    }
     
-    .header {{
+    .header {
         text-align: center;
         background: linear-gradient(135deg, #e3f2fd, #bbdefb);
         color: #0d47a1;
@@ -702,15 +1732,15 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         border: 2px solid #90caf9;
         position: relative;
         z-index: 2;
-    }}
+    }
     
-    .header h1 {{
+    .header h1 {
         font-size: 32px;
         font-weight: bold;
-    }}
+    }
     
     /* --- SYLLABUS BOX STYLES (REQUIRED FOR ALL) --- */
-    .syllabus-container {{
+    .syllabus-container {
         border: 2px solid #ced4da;
         border-radius: 12px;
         padding: 20px;
@@ -718,9 +1748,9 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         background-color: #f8f9fa;
         box-shadow: 0 4px 12px rgba(0,0,0,0.05);
         page-break-inside: avoid;
-    }}
+    }
     
-    .syllabus-header h2 {{
+    .syllabus-header h2 {
         font-size: 24px;
         color: #1976d2;
         border-bottom: 3px solid #1976d2;
@@ -731,37 +1761,37 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         display: flex;
         align-items: center;
         gap: 10px;
-    }}
+    }
     
-    .syllabus-content {{
+    .syllabus-content {
         display: block;
         width: 100%;
         background-color: #ffffff;
         padding: 20px;
         border-radius: 8px;
         border: 1px solid #e0e0e0;
-    }}
+    }
     
-    .subject-line {{
+    .subject-line {
         margin-bottom: 15px;
         font-size: 16px;
         line-height: 1.6;
-    }}
+    }
     
-    .subject-name {{
+    .subject-name {
         font-weight: bold;
         color: #1565c0;
         display: inline-block;
         min-width: 80px;
-    }}
+    }
     
-    .subject-topics {{
+    .subject-topics {
         color: #424242;
         margin-left: 10px;
-    }}
+    }
     /* --- END SYLLABUS BOX STYLES --- */
     
-    .question-container {{
+    .question-container {
         background-color: #ffffff;
         border: 2px solid #e9ecef;
         border-radius: 12px;
@@ -771,9 +1801,9 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         box-shadow: 0 2px 10px rgba(0,0,0,0.05);
         position: relative;
         z-index: 2;
-    }}
+    }
     
-    .question-watermark {{
+    .question-watermark {
         position: absolute;
         top: 15px;
         right: 20px;
@@ -793,22 +1823,22 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         box-shadow: 0 2px 8px rgba(33, 150, 243, 0.2);
         text-decoration: none;
         transition: all 0.3s ease;
-    }}
+    }
     
-    .question-watermark:hover {{
+    .question-watermark:hover {
         background: linear-gradient(135deg, rgba(100, 181, 246, 0.35), rgba(66, 165, 245, 0.35));
         border-color: rgba(33, 150, 243, 0.6);
         color: rgba(13, 71, 161, 1);
         transform: scale(1.05);
-    }}
+    }
     
-    .question-header {{
+    .question-header {
         display: flex;
         align-items: center;
         margin-bottom: 20px;
-    }}
+    }
     
-    .question-number {{
+    .question-number {
         background: linear-gradient(135deg, #42a5f5, #1976d2);
         color: white;
         min-width: 120px;
@@ -821,24 +1851,24 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         font-size: 16px;
         box-shadow: 0 2px 8px rgba(33, 150, 243, 0.3);
         padding: 0 15px;
-    }}
+    }
     
-    .question-text {{
+    .question-text {
         padding: 20px 0;
         margin-bottom: 20px;
         font-size: 18px;
         line-height: 1.7;
         font-weight: 500;
         color: #2d2d2d;
-    }}
+    }
     
-    .options {{
+    .options {
         display: grid;
         grid-template-columns: 1fr 1fr;
         gap: 15px;
-    }}
+    }
     
-    .option {{
+    .option {
         background-color: #f8f9fa;
         border: 2px solid #dee2e6;
         border-radius: 8px;
@@ -848,18 +1878,18 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         align-items: flex-start;
         gap: 12px;
         transition: all 0.2s ease;
-    }}
+    }
     
-    .option.correct {{
+    .option.correct {
         background-color: #e3f2fd;
         border-color: #1976d2;
         color: #0d47a1;
         font-weight: 600;
         box-shadow: 0 2px 8px rgba(25,118,210,0.2);
         position: relative;
-    }}
+    }
     
-    .option-label {{
+    .option-label {
         background-color: #6c757d;
         color: white;
         width: 28px;
@@ -871,106 +1901,48 @@ def generate_questions_answers_only_html(data, test_title, syllabus_html=""):
         font-weight: bold;
         font-size: 14px;
         flex-shrink: 0;
-    }}
+    }
     
-    .option.correct .option-label {{
+    .option.correct .option-label {
         background-color: #1976d2;
-    }}
+    }
     
-    @media (max-width: 768px) {{
-        .options {{
+    @media (max-width: 768px) {
+        .options {
             grid-template-columns: 1fr;
-        }}
+        }
         
-        .syllabus-content {{
+        .syllabus-content {
             width: 100%;
-        }}
+        }
         
-        body {{
+        body {
             padding: 15px;
-        }}
+        }
         
-        .question-header {{
+        .question-header {
             flex-direction: column;
             align-items: flex-start;
-        }}
+        }
         
-        .question-watermark {{
+        .question-watermark {
             top: 12px;
             right: 15px;
             padding: 6px 12px;
             font-size: 12px;
             letter-spacing: 0.5px;
-        }}
-    }}
-</style>
-</head>
-<body>
-    <div class='header'>
-        <h1>{test_title} - Questions with Answers</h1>
-    </div>
-    {syllabus_html}
-    """
-    
-    for idx, q in enumerate(data, 1):
-        processed_body = process_html_content(q['body'])
-        
-        html += f"""
-    <div class='question-container'>
-        <a href='https://t.me/SAD_LYFFFF' target='_blank' class='question-watermark'>SAD_LYFFFF</a>
-        <div class='question-header'>
-            <div class='question-number'>Question {idx}</div>
-        </div>
-        <div class='question-text'>{processed_body}</div>
-        <div class='options'>
-        """
-        
-        # Process options with correct answer marking
-        alternatives = q["alternatives"][:4]
-        labels = ["A", "B", "C", "D"]
-        
-        for opt_idx, opt in enumerate(alternatives):
-            if opt_idx < len(labels):
-                label = labels[opt_idx]
-                is_correct = str(opt.get("score_if_chosen")) == "1"
-                opt_class = "option correct" if is_correct else "option"
-                processed_answer = process_html_content(opt['answer'])
-                html += f"""
-            <div class='{opt_class}'>
-                <div class='option-label'>{label}</div>
-                <div class='option-text'>{processed_answer}</div>
-            </div>
-                """
-        
-        html += """
-        </div>
-    </div>
-        """
-    
-    html += """
-</body>
-</html>
-    """
-    
-    return html
+        }
+    }
+"""  # Theme 2.1
 
-# Theme 2.2: Questions with Marked Correct Answers (with solutions)
-def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
-    """Generate HTML with questions, marked correct answers, and solutions"""
-    html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset='UTF-8'>
-<title>{test_title}</title>
-<style>
-    * {{
+QUESTIONS_SOLUTIONS_STYLE = """
+    * {
         margin: 0;
         padding: 0;
         box-sizing: border-box;
-    }}
+    }
     
-    body {{
+    body {
         font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
         background-color: #ffffff;
         color: #333333;
@@ -979,9 +1951,9 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         max-width: 1200px;
         margin: 0 auto;
         position: relative;
-    }}
+    }
     
-    .header {{
+    .header {
         text-align: center;
         background: linear-gradient(135deg, #e8f5e8, #f0f9f0);
         color: #2d5a2d;
@@ -992,15 +1964,15 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         border: 2px solid #c3e6c3;
         position: relative;
         z-index: 2;
-    }}
+    }
     
-    .header h1 {{
+    .header h1 {
         font-size: 32px;
         font-weight: bold;
-    }}
+    }
     
     /* --- SYLLABUS BOX STYLES (REQUIRED FOR ALL) --- */
-    .syllabus-container {{
+    .syllabus-container {
         border: 2px solid #ced4da;
         border-radius: 12px;
         padding: 20px;
@@ -1008,9 +1980,9 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         background-color: #f8f9fa;
         box-shadow: 0 4px 12px rgba(0,0,0,0.05);
         page-break-inside: avoid;
-    }}
+    }
     
-    .syllabus-header h2 {{
+    .syllabus-header h2 {
         font-size: 24px;
         color: #2196f3;
         border-bottom: 3px solid #2196f3;
@@ -1021,37 +1993,37 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         display: flex;
         align-items: center;
         gap: 10px;
-    }}
+    }
     
-    .syllabus-content {{
+    .syllabus-content {
         display: block;
         width: 100%;
         background-color: #ffffff;
         padding: 20px;
         border-radius: 8px;
         border: 1px solid #e0e0e0;
-    }}
+    }
     
-    .subject-line {{
+    .subject-line {
         margin-bottom: 15px;
         font-size: 16px;
         line-height: 1.6;
-    }}
+    }
     
-    .subject-name {{
+    .subject-name {
         font-weight: bold;
         color: #2d5a2d;
         display: inline-block;
         min-width: 80px;
-    }}
+    }
     
-    .subject-topics {{
+    .subject-topics {
         color: #424242;
         margin-left: 10px;
-    }}
+    }
     /* --- END SYLLABUS BOX STYLES --- */
     
-    .question-container {{
+    .question-container {
         background-color: #ffffff;
         border: 2px solid #e9ecef;
         border-radius: 12px;
@@ -1061,9 +2033,9 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         box-shadow: 0 2px 10px rgba(0,0,0,0.05);
         position: relative;
         z-index: 2;
-    }}
+    }
     
-    .question-watermark {{
+    .question-watermark {
         position: absolute;
         top: 15px;
         right: 20px;
@@ -1083,22 +2055,22 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         box-shadow: 0 2px 8px rgba(102, 205, 170, 0.2);
         text-decoration: none;
         transition: all 0.3s ease;
-    }}
+    }
     
-    .question-watermark:hover {{
+    .question-watermark:hover {
         background: linear-gradient(135deg, rgba(173, 216, 230, 0.35), rgba(144, 238, 144, 0.35));
         border-color: rgba(102, 205, 170, 0.6);
         color: rgba(72, 139, 139, 1);
         transform: scale(1.05);
-    }}
+    }
     
-    .question-header {{
+    .question-header {
         display: flex;
         align-items: center;
         margin-bottom: 20px;
-    }}
+    }
     
-    .question-number {{
+    .question-number {
         background: linear-gradient(135deg, #66cdaa, #48a999);
         color: white;
         min-width: 120px;
@@ -1111,24 +2083,24 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         font-size: 16px;
         box-shadow: 0 2px 8px rgba(102, 205, 170, 0.3);
         padding: 0 15px;
-    }}
+    }
     
-    .question-text {{
+    .question-text {
         padding: 20px 0;
         margin-bottom: 20px;
         font-size: 18px;
         line-height: 1.7;
         font-weight: 500;
         color: #2d2d2d;
-    }}
+    }
     
-    .options {{
+    .options {
         display: grid;
         grid-template-columns: 1fr 1fr;
         gap: 15px;
-    }}
+    }
     
-    .option {{
+    .option {
         background-color: #f8f9fa;
         border: 2px solid #dee2e6;
         border-radius: 8px;
@@ -1138,18 +2110,18 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         align-items: flex-start;
         gap: 12px;
         transition: all 0.2s ease;
-    }}
+    }
     
-    .option.correct {{
+    .option.correct {
         background-color: #d4edda;
         border-color: #28a745;
         color: #155724;
         font-weight: 600;
         box-shadow: 0 2px 8px rgba(40,167,69,0.2);
         position: relative;
-    }}
+    }
     
-    .option-label {{
+    .option-label {
         background-color: #6c757d;
         color: white;
         width: 28px;
@@ -1161,27 +2133,27 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         font-weight: bold;
         font-size: 14px;
         flex-shrink: 0;
-    }}
+    }
     
-    .option.correct .option-label {{
+    .option.correct .option-label {
         background-color: #28a745;
-    }}
+    }
     
-    .solution-section {{
+    .solution-section {
         background: linear-gradient(135deg, #e3f2fd, #bbdefb);
         border: 2px solid #2196f3;
         border-radius: 12px;
         padding: 20px;
         margin-top: 20px;
-    }}
+    }
     
-    .solution-header {{
+    .solution-header {
         display: flex;
         align-items: center;
         margin-bottom: 15px;
-    }}
+    }
     
-    .solution-icon {{
+    .solution-icon {
         background: linear-gradient(135deg, #2196f3, #1976d2);
         color: white;
         width: 32px;
@@ -1193,15 +2165,15 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         font-weight: bold;
         font-size: 16px;
         margin-right: 12px;
-    }}
+    }
     
-    .solution-title {{
+    .solution-title {
         font-size: 18px;
         font-weight: bold;
         color: #1976d2;
-    }}
+    }
     
-    .solution-content {{
+    .solution-content {
         font-size: 16px;
         line-height: 1.7;
         color: #424242;
@@ -1209,9 +2181,9 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         padding: 15px;
         border-radius: 8px;
         border: 1px solid #e0e0e0;
-    }}
+    }
     
-    .no-solution {{
+    .no-solution {
         color: #757575;
         font-style: italic;
         text-align: center;
@@ -1219,120 +2191,568 @@ def generate_questions_with_answers_html(data, test_title, syllabus_html=""):
         background-color: #fafafa;
         border-radius: 8px;
         border: 1px dashed #e0e0e0;
-    }}
+    }
     
-    @media (max-width: 768px) {{
-        .options {{
+    @media (max-width: 768px) {
+        .options {
             grid-template-columns: 1fr;
-        }}
+        }
         
-        .syllabus-content {{
+        .syllabus-content {
             width: 100%;
-        }}
+        }
         
-        body {{
+        body {
             padding: 15px;
-        }}
+        }
         
-        .question-header {{
+        .question-header {
             flex-direction: column;
             align-items: flex-start;
-        }}
+        }
         
-        .question-watermark {{
+        .question-watermark {
             top: 12px;
             right: 15px;
             padding: 6px 12px;
             font-size: 12px;
             letter-spacing: 0.5px;
-        }}
-    }}
-</style>
+        }
+    }
+"""  # Theme 2.2
+
+OPTION_LABELS = ["A", "B", "C", "D"]
+
+def prepare_questions(data, with_solutions=False):
+    """
+    Turns the Question list into sanitized, render-ready fragments once, so that
+    every output format renders from the same processed HTML. Each item has:
+      body     - processed question HTML
+      options  - list of (label, processed answer HTML, is_correct), at most 4
+      solution - processed solution HTML (possibly "" once sanitized), or None when
+                 the question has none (only filled in when with_solutions is True)
+    """
+    prepared = []
+    for q in data:
+        options = []
+        for label, opt in zip(OPTION_LABELS, q.options[:4]):
+            options.append((label, process_html_content(opt.answer), opt.is_correct))
+
+        solution_html = None
+        if with_solutions:
+            # Prefer the detailed solution, then the short solution, then the explanation
+            for field in ("detailed_solution", "solution", "explanation"):
+                value = getattr(q, field)
+                solution_text = str(value).strip() if value else ""
+                if solution_text:
+                    solution_html = process_html_content(solution_text)
+                    break
+
+        prepared.append({
+            "body": process_html_content(q.body),
+            "options": options,
+            "solution": solution_html,
+        })
+    return prepared
+
+# Theme 1: Questions Only (No answers shown)
+def questions_only_head(test_title, syllabus_html=""):
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>{test_title}</title>
+<style>{QUESTIONS_ONLY_STYLE}</style>
 </head>
 <body>
     <div class='header'>
-        <h1>{test_title}</h1>
+        <h1>{test_title} - Questions Only</h1>
     </div>
     {syllabus_html}
     """
-    
-    for idx, q in enumerate(data, 1):
-        processed_body = process_html_content(q['body'])
-        
-        html += f"""
+
+QUESTIONS_ONLY_NUMBER = """
     <div class='question-container'>
         <a href='https://t.me/NEETSQUARE' target='_blank' class='question-watermark'>NEETSQUARE</a>
         <div class='question-header'>
-            <div class='question-number'>Question {idx}</div>
+            <div class='question-number'>Question {idx}</div>"""
+
+def questions_only_fragment(q):
+    """Markup of one prepared question after its number (no correct answers marked)."""
+    parts = [f"""
         </div>
-        <div class='question-text'>{processed_body}</div>
+        <div class='question-text'>{q['body']}</div>
         <div class='options'>
-        """
-        
-        # Process options with correct answer marking
-        alternatives = q["alternatives"][:4]
-        labels = ["A", "B", "C", "D"]
-        
-        for opt_idx, opt in enumerate(alternatives):
-            if opt_idx < len(labels):
-                label = labels[opt_idx]
-                is_correct = str(opt.get("score_if_chosen")) == "1"
-                opt_class = "option correct" if is_correct else "option"
-                processed_answer = process_html_content(opt['answer'])
-                html += f"""
+        """]
+    
+    # Options (no correct answer marking)
+    for label, processed_answer, is_correct in q["options"]:
+        parts.append(f"""
+            <div class='option'>
+                <div class='option-label'>{label}</div>
+                <div class='option-text'>{processed_answer}</div>
+            </div>
+                """)
+    
+    parts.append("""
+        </div>
+    </div>
+        """)
+    return "".join(parts)
+
+# Theme 2.1: Questions with Marked Correct Answers (NO solutions)
+def questions_answers_head(test_title, syllabus_html=""):
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>{test_title}</title>
+<style>{QUESTIONS_ANSWERS_STYLE}</style>
+</head>
+<body>
+    <div class='header'>
+        <h1>{test_title} - Questions with Answers</h1>
+    </div>
+    {syllabus_html}
+    """
+
+QUESTIONS_ANSWERS_NUMBER = """
+    <div class='question-container'>
+        <a href='https://t.me/SAD_LYFFFF' target='_blank' class='question-watermark'>SAD_LYFFFF</a>
+        <div class='question-header'>
+            <div class='question-number'>Question {idx}</div>"""
+
+def marked_options_html(q):
+    """Opening of a question's body and its options, with the correct ones marked."""
+    parts = [f"""
+        </div>
+        <div class='question-text'>{q['body']}</div>
+        <div class='options'>
+        """]
+    
+    # Options with correct answer marking
+    for label, processed_answer, is_correct in q["options"]:
+        opt_class = "option correct" if is_correct else "option"
+        parts.append(f"""
             <div class='{opt_class}'>
                 <div class='option-label'>{label}</div>
                 <div class='option-text'>{processed_answer}</div>
             </div>
-                """
-        
-        html += """
+                """)
+    return parts
+
+def questions_answers_fragment(q):
+    """Markup of one prepared question after its number (correct answers marked, no solution)."""
+    parts = marked_options_html(q)
+    parts.append("""
         </div>
-        """
-        
-        # Add solution section after each question
-        detailed_solution = str(q.get("detailed_solution", "")).strip() if q.get("detailed_solution") else ""
-        solution = str(q.get("solution", "")).strip() if q.get("solution") else ""
-        explanation = str(q.get("explanation", "")).strip() if q.get("explanation") else ""
-        
-        html += """
+    </div>
+        """)
+    return "".join(parts)
+
+# Theme 2.2: Questions with Marked Correct Answers (with solutions)
+def questions_solutions_head(test_title, syllabus_html=""):
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset='UTF-8'>
+<title>{test_title}</title>
+<style>{QUESTIONS_SOLUTIONS_STYLE}</style>
+</head>
+<body>
+    <div class='header'>
+        <h1>{test_title}</h1>
+    </div>
+    {syllabus_html}
+    """
+
+QUESTIONS_SOLUTIONS_NUMBER = QUESTIONS_ONLY_NUMBER
+
+def questions_solutions_fragment(q):
+    """Markup of one prepared question after its number (correct answers marked, with solution)."""
+    parts = marked_options_html(q)
+    parts.append("""
+        </div>
+        """)
+    
+    # Add solution section after each question
+    parts.append("""
         <div class='solution-section'>
             <div class='solution-header'>
                 <div class='solution-icon'>💡</div>
                 <div class='solution-title'>Solution</div>
             </div>
-        """
-        
-        if detailed_solution:
-            html += f"""
-            <div class='solution-content'>{process_html_content(detailed_solution)}</div>
-            """
-        elif solution:
-            html += f"""
-            <div class='solution-content'>{process_html_content(solution)}</div>
-            """
-        elif explanation:
-            html += f"""
-            <div class='solution-content'>{process_html_content(explanation)}</div>
-            """
-        else:
-            html += f"""
+        """)
+    
+    if q["solution"] is not None:
+        parts.append(f"""
+            <div class='solution-content'>{q["solution"]}</div>
+            """)
+    else:
+        parts.append(f"""
             <div class='no-solution'>
                 No detailed solution available for this question.
             </div>
-            """
-        
-        html += """
+            """)
+    
+    parts.append("""
         </div>
     </div>
-        """
-    
-    html += """
+        """)
+    return "".join(parts)
+
+DOCUMENT_FOOT = """
 </body>
 </html>
     """
-    
-    return html
+
+def assemble_document(head, number_template, fragments):
+    """Joins a document head, each question's number and fragment, and the closing tags."""
+    parts = [head]
+    for idx, fragment in enumerate(fragments, 1):
+        parts.append(number_template.format(idx=idx))
+        parts.append(fragment)
+    parts.append(DOCUMENT_FOOT)
+    return "".join(parts)
+
+@dataclass(frozen=True)
+class RenderFormat:
+    """How one output format is built: see assemble_document and render_documents."""
+    head: object  # (test_title, syllabus_html) -> str
+    number_template: str
+    fragment: object  # prepared question -> str
+    with_solutions: bool = False
+
+# Output formats by file-name suffix
+RENDER_FORMATS = {
+    "Questions_Only": RenderFormat(questions_only_head, QUESTIONS_ONLY_NUMBER, questions_only_fragment),
+    "Questions_Answers": RenderFormat(questions_answers_head, QUESTIONS_ANSWERS_NUMBER, questions_answers_fragment),
+    "Questions_Solutions": RenderFormat(
+        questions_solutions_head, QUESTIONS_SOLUTIONS_NUMBER, questions_solutions_fragment, with_solutions=True
+    ),
+}
+
+# Persistent cache of rendered per-question fragments, keyed by question id, output format
+# and a hash of the question's source content, so tests sharing questions reuse them
+FRAGMENT_CACHE = os.environ.get("FRAGMENT_CACHE", "1") == "1"
+FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get("FRAGMENT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+FRAGMENT_RENDER_VERSION = 4  # Bump when fragment markup or sanitization changes
+
+def question_digest(q) -> bytes:
+    """Hash of everything a question's fragments are rendered from."""
+    source = (
+        FRAGMENT_RENDER_VERSION, SANITIZER_BACKEND,
+        q.body, [(opt.answer, opt.is_correct) for opt in q.options[:len(OPTION_LABELS)]],
+        q.detailed_solution, q.solution, q.explanation,
+    )
+    return fragment_key(repr(source))
+
+class FragmentCache:
+    """
+    SQLite-backed store of rendered question fragments. There is one row per question
+    and format; a row whose source hash no longer matches the question is simply
+    replaced on the next render. Least recently used rows are evicted once the total
+    size exceeds max_bytes. Each render worker process opens its own connection.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fragments ("
+            " qid TEXT NOT NULL, format TEXT NOT NULL, source_hash BLOB NOT NULL, html TEXT NOT NULL,"
+            " accessed_at REAL NOT NULL, size INTEGER NOT NULL, PRIMARY KEY (qid, format))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS fragments_accessed ON fragments (accessed_at)")
+        self._db.commit()
+
+    def get_many(self, format_name, keys):
+        """Returns {(qid, source_hash): html} for those of keys that are cached and current."""
+        found = {}
+        wanted = set(keys)
+        qids = sorted({qid for qid, _ in wanted})
+        with self._lock:
+            for i in range(0, len(qids), 500):
+                chunk = qids[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT qid, source_hash, html FROM fragments WHERE format = ? AND qid IN ({','.join('?' * len(chunk))})",
+                    (format_name, *chunk),
+                ).fetchall()
+                for qid, source_hash, html in rows:
+                    if (qid, source_hash) in wanted:
+                        found[(qid, source_hash)] = html
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE fragments SET accessed_at = ? WHERE qid = ? AND format = ?",
+                    [(now, qid, format_name) for qid, _ in found],
+                )
+                self._db.commit()
+        self.hits += len(found)
+        self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, format_name, rows):
+        """Stores (qid, source_hash, html) rows and evicts old ones if over the size cap."""
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO fragments (qid, format, source_hash, html, accessed_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(qid, format_name, source_hash, html, now, len(html)) for qid, source_hash, html in rows],
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for qid, format_name, size in self._db.execute(
+            "SELECT qid, format, size FROM fragments ORDER BY accessed_at"
+        ).fetchall():
+            self._db.execute("DELETE FROM fragments WHERE qid = ? AND format = ?", (qid, format_name))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+_fragment_cache = None
+
+def get_fragment_cache():
+    """Return this process's fragment cache, opening it on first use (None when disabled)."""
+    global _fragment_cache
+    if not FRAGMENT_CACHE:
+        return None
+    if _fragment_cache is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _fragment_cache = FragmentCache(os.path.join(CACHE_DIR, "fragments.sqlite3"), FRAGMENT_CACHE_MAX_BYTES)
+    return _fragment_cache
+
+def close_fragment_cache() -> None:
+    global _fragment_cache
+    if _fragment_cache is not None:
+        _fragment_cache.close()
+        _fragment_cache = None
+
+# Telegram file_ids of delivered documents, so identical output is resent without rendering or uploading
+class FileIdCache:
+    """
+    SQLite-backed map of (NID, format) to the file_id Telegram returned for the last
+    upload, with the render key (see document_render_key) of the document it holds.
+    A lookup only matches while the render key is unchanged.
+    """
+
+    def __init__(self, path):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS file_ids ("
+            " nid TEXT NOT NULL, format TEXT NOT NULL, render_key BLOB NOT NULL, file_id TEXT NOT NULL,"
+            " uploaded_at REAL NOT NULL, PRIMARY KEY (nid, format))"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(file_ids)")]
+        if "note" not in columns:
+            self._db.execute("ALTER TABLE file_ids ADD COLUMN note TEXT")
+        self._db.commit()
+
+    def get(self, nid, format_name, render_key, with_note=False):
+        """
+        Returns the file_id holding this exact document, or None. With with_note, returns
+        a (file_id, note) tuple instead, note being the text stored alongside it.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT render_key, file_id, note FROM file_ids WHERE nid = ? AND format = ?", (nid, format_name)
+            ).fetchone()
+        if row is None or row[0] != render_key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return (row[1], row[2]) if with_note else row[1]
+
+    def put(self, nid, format_name, render_key, file_id, note=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO file_ids (nid, format, render_key, file_id, uploaded_at, note)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (nid, format_name, render_key, file_id, time.time(), note),
+            )
+            self._db.commit()
+
+    def drop(self, nid, format_name):
+        """Forgets a file_id that Telegram rejected."""
+        self.stale += 1
+        with self._lock:
+            self._db.execute("DELETE FROM file_ids WHERE nid = ? AND format = ?", (nid, format_name))
+            self._db.commit()
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.stale} stale"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+_file_id_cache = None
+
+def get_file_id_cache() -> FileIdCache:
+    """Return the shared file_id cache, opening it on first use."""
+    global _file_id_cache
+    if _file_id_cache is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _file_id_cache = FileIdCache(os.path.join(CACHE_DIR, "file_ids.sqlite3"))
+    return _file_id_cache
+
+def close_file_id_cache() -> None:
+    global _file_id_cache
+    if _file_id_cache is not None:
+        _file_id_cache.close()
+        _file_id_cache = None
+
+def document_render_key(format_name, title, syllabus_html, question_digests) -> bytes:
+    """Hash of everything a document is rendered from; equal keys mean identical documents."""
+    return fragment_key(repr((FRAGMENT_RENDER_VERSION, format_name, title, syllabus_html, question_digests)))
+
+# Worker processes for the CPU-bound part of an extraction (sanitization and rendering);
+# defaults to the CPUs this process may run on, which a container may restrict
+RENDER_WORKERS = int(os.environ.get(
+    "RENDER_WORKERS",
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1),
+))
+
+_render_pool = None
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Return the shared render process pool, starting it on first use."""
+    global _render_pool
+    if _render_pool is None:
+        # spawn: workers must not inherit the bot's event loop, threads or sockets
+        _render_pool = ProcessPoolExecutor(
+            max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _render_pool
+
+def warm_render_pool() -> None:
+    """Starts the render workers ahead of the first extraction (their imports take a moment)."""
+    pool = get_render_pool()
+    for _ in range(RENDER_WORKERS):
+        pool.submit(os.getpid)
+
+def shutdown_render_pool() -> None:
+    """Stops the render worker processes without waiting for queued work."""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+def render_documents(data, syllabus_html, title, format_names):
+    """
+    Builds the requested documents for one extraction. Question fragments already in
+    the fragment cache are reused; only the remaining questions are sanitized and rendered.
+    Runs inside a render worker process; returns ([(format_name, html), ...], timings,
+    (worker pid, fragment_memo_counters())).
+    """
+    timings = {}
+    formats = [(name, RENDER_FORMATS[name]) for name in format_names]
+    started = time.perf_counter()
+    cache = get_fragment_cache()
+    digests = [question_digest(q) for q in data]
+    fragments = {name: [None] * len(data) for name in format_names}
+    if cache is not None:
+        try:
+            for name in format_names:
+                found = cache.get_many(name, [(q.qid, digest) for q, digest in zip(data, digests)])
+                fragments[name] = [found.get((q.qid, digest)) for q, digest in zip(data, digests)]
+        except sqlite3.Error as e:
+            logger.warning(f"Fragment cache lookup failed, rendering every question: {e}")
+    missing = [i for i in range(len(data)) if any(fragments[name][i] is None for name in format_names)]
+    timings["fragment_lookup"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    prepared_questions = prepare_questions(
+        [data[i] for i in missing], with_solutions=any(fmt.with_solutions for _, fmt in formats)
+    )
+    timings["prepare"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new_fragments = {name: [] for name in format_names}
+    for i, prepared in zip(missing, prepared_questions):
+        for name, fmt in formats:
+            if fragments[name][i] is None:
+                fragments[name][i] = fmt.fragment(prepared)
+                new_fragments[name].append((data[i].qid, digests[i], fragments[name][i]))
+    documents = [
+        (name, assemble_document(fmt.head(title, syllabus_html), fmt.number_template, fragments[name]))
+        for name, fmt in formats
+    ]
+    timings["render"] = time.perf_counter() - started
+
+    if cache is not None:
+        try:
+            for name in format_names:
+                cache.put_many(name, new_fragments[name])
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store rendered fragments: {e}")
+    logger.info(
+        f"Render worker {os.getpid()}: {len(data) - len(missing)}/{len(data)} questions from the fragment cache; "
+        f"fragment memo: {fragment_memo_stats()}"
+    )
+    return documents, timings, (os.getpid(), fragment_memo_counters())
+
+# Latest fragment memo counters reported by each render worker, by process id
+render_memo_counters = {}
+
+def render_memo_stats() -> str:
+    """Fragment memo totals across the render workers, where sanitization runs."""
+    if not render_memo_counters:
+        return "no documents rendered yet"
+    totals = {}
+    for counters in render_memo_counters.values():
+        for name, values in counters.items():
+            totals[name] = [a + b for a, b in zip(totals.get(name, (0, 0, 0)), values)]
+    summary = "; ".join(
+        f"{name} {entries} entries, {hits} hits, {misses} misses" for name, (entries, hits, misses) in totals.items()
+    )
+    return f"{summary} ({len(render_memo_counters)} workers)"
+
+async def render_documents_async(data, syllabus_html, title, format_names):
+    """
+    Runs render_documents in the process pool so the event loop stays responsive.
+    Returns (documents, timings) and records the worker's memo counters for /stats.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        documents, timings, (pid, counters) = await loop.run_in_executor(
+            get_render_pool(), render_documents, data, syllabus_html, title, format_names
+        )
+    except BrokenProcessPool:
+        logger.error("Render pool is broken; restarting it and rendering in a thread this time")
+        shutdown_render_pool()
+        documents, timings, (pid, counters) = await asyncio.to_thread(
+            render_documents, data, syllabus_html, title, format_names
+        )
+    render_memo_counters[pid] = counters
+    return documents, timings
 
 def format_quiz_info(quiz_data):
     """Format quiz data into readable message"""
@@ -1478,6 +2898,7 @@ async def list_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"• /auth - Authorize new users\n"
         f"• /listusers - View all authorized users\n"
         f"• /removeuser - Remove user authorization\n"
+        f"• /stats - View bot statistics\n"
     )
     
     await update.message.reply_text(user_list_message, parse_mode='HTML')
@@ -1552,6 +2973,48 @@ async def remove_user_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Log the removal
     logger.info(f"Owner {OWNER_ID} removed user {target_user_id}. Remaining users: {len(AUTHORIZED_USER_IDS)}")
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /stats command - only owner can use this"""
+    if update.effective_user.id != OWNER_ID:
+        await update.message.reply_text(
+            "🚫 <b>Access Denied</b>\n\n"
+            "❌ Only the bot owner can view bot statistics.",
+            parse_mode='HTML'
+        )
+        return
+
+    stats_message = (
+        "📊 <b>Bot Statistics</b>\n\n"
+        "🔗 <b>Upstream Request Coalescing:</b>\n"
+        f"• Upstream fetches started: {COALESCE_STATS['fetches']}\n"
+        f"• Requests deduplicated: {COALESCE_STATS['deduplicated']}\n"
+        f"• Fetches in flight: {len(_inflight_fetches)}\n"
+    )
+    for (kind, nid), entry in list(_inflight_fetches.items()):
+        stats_message += f"  ◦ {kind} <code>{nid}</code> ({entry['waiters']} waiting)\n"
+
+    stats_message += f"\n🗂 <b>Info Cache:</b> {metadata_cache.stats()}\n"
+    stats_message += f"🧩 <b>Fragment Memo (render workers):</b> {render_memo_stats()}\n"
+    stats_message += f"📦 <b>File ID Cache:</b> {get_file_id_cache().stats()}\n"
+    stats_message += (
+        f"⚙️ <b>Extractions:</b> {EXTRACTION_STATS['running']}/{EXTRACTION_WORKERS} running, "
+        f"{EXTRACTION_STATS['queued']} queued\n"
+    )
+
+    stats_message += (
+        "\n🛡 <b>Upstream Protection:</b>\n"
+        f"• Circuit breaker: {upstream_breaker.stats()}\n"
+        f"• Rate limiter: {upstream_rate_limiter.stats()}\n"
+    )
+
+    stats_message += f"• Health: {health_summary()}\n"
+
+    stats_message += "\n⏱ <b>Upstream Latency:</b>\n"
+    for kind, tracker in upstream_latency.items():
+        stats_message += f"• {kind}: {tracker.stats()}\n"
+
+    await update.message.reply_text(stats_message, parse_mode='HTML')
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Starts the conversation with main menu."""
     if update.effective_user.id not in AUTHORIZED_USER_IDS:
@@ -1563,7 +3026,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         logger.warning(f"Unauthorized access attempt by user ID: {update.effective_user.id}")
         return ConversationHandler.END
 
-    if not check_internet_connection():
+    # Any pending prefetch belongs to a conversation the user has just left
+    cancel_prefetch(context)
+
+    if not network_available():
         await update.message.reply_text("🌐 *Network connectivity issue detected\\.* Please check your internet connection and try again\\.", parse_mode='MarkdownV2')
         return ConversationHandler.END
 
@@ -1658,6 +3124,7 @@ async def extract_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("🚫 *Access Denied*\n\n❌ You are not authorized to use this bot\\.", parse_mode='MarkdownV2')
         return ConversationHandler.END
     
+    cancel_prefetch(context)
     await update.message.reply_text("📚 *Extract Test*\n\n📢 Please send the *NID* \\(Numerical ID\\) for the test you want to extract:", parse_mode='MarkdownV2')
     return ASK_NID
 
@@ -1674,10 +3141,9 @@ async def handle_info_nid(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     try:
         loading_message = await update.message.reply_text("🔄 Fetching quiz information... ⏳")
-        quiz_data = await fetch_quiz_info(nid)
+        formatted_info = await fetch_quiz_info(nid)
         
-        if quiz_data:
-            formatted_info = format_quiz_info(quiz_data)
+        if formatted_info:
             await loading_message.edit_text(formatted_info, parse_mode='HTML')
         else:
             await loading_message.edit_text(
@@ -1729,10 +3195,9 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             return
 
         loading_message = await update.message.reply_text("🔄 Fetching quiz information... ⏳")
-        quiz_data = fetch_test_metadata(nid) # Use synchronous fetch_test_metadata here
+        formatted_info = await fetch_quiz_info(nid)
         
-        if quiz_data:
-            formatted_info = format_quiz_info(quiz_data)
+        if formatted_info:
             await loading_message.edit_text(formatted_info, parse_mode='HTML')
         else:
             await loading_message.edit_text(
@@ -1764,31 +3229,205 @@ async def handle_nid(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         return ASK_NID
         
     context.user_data['nid'] = nid
+    # Fetch in the background while the user reads the format menu
+    start_prefetch(context, nid)
     
-    # Create inline keyboard for format selection (3 options only)
+    await update.message.reply_text(
+        "📋 Choose your preferred format:\n\n"
+        "📝 Questions Only: Clean format, no answers shown\n"
+        "✅ Questions + Answers: Correct answers highlighted\n"
+        "📖 Questions + Solutions: Correct answers + detailed solutions after each question\n"
+        "📦 All Formats: Get all 3 files at once\n"
+        "🗜 ZIP: Turn on to get your choice as one compressed archive (smaller, faster to download)",
+        reply_markup=format_menu(zip_archive=False)
+    )
+    return CHOOSE_FORMAT
+
+# A format choice ending in ZIP_SUFFIX is delivered as one ZIP archive
+ZIP_SUFFIX = "_zip"
+
+def format_menu(zip_archive: bool) -> InlineKeyboardMarkup:
+    """The format selection keyboard; with zip_archive on, every choice is sent as a ZIP."""
+    suffix = ZIP_SUFFIX if zip_archive else ""
     keyboard = [
         [ 
-            InlineKeyboardButton("📝 Questions Only", callback_data="questions_only"),
-            InlineKeyboardButton("✅ Questions + Answers", callback_data="questions_answers")
+            InlineKeyboardButton("📝 Questions Only", callback_data=f"questions_only{suffix}"),
+            InlineKeyboardButton("✅ Questions + Answers", callback_data=f"questions_answers{suffix}")
+        ],
+        [ 
+            InlineKeyboardButton("📖 Questions + Solutions", callback_data=f"questions_solutions{suffix}")
         ],
         [ 
-            InlineKeyboardButton("📖 Questions + Solutions", callback_data="questions_solutions")
+            InlineKeyboardButton("📦 All Formats" if zip_archive else "📦 All Formats (3 files)",
+                                 callback_data=f"all_formats{suffix}")
         ],
         [ 
-            InlineKeyboardButton("📦 All Formats (3 files)", callback_data="all_formats")
+            InlineKeyboardButton(
+                "🗜 ZIP: ON (tap to turn off)" if zip_archive else "🗜 ZIP: OFF (tap to turn on)",
+                callback_data="zip_off" if zip_archive else "zip_on"
+            )
         ]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        "📋 Choose your preferred format:\n\n"
-        "📝 Questions Only: Clean format, no answers shown\n"
-        "✅ Questions + Answers: Correct answers highlighted\n"
-        "📖 Questions + Solutions: Correct answers + detailed solutions after each question\n"
-        "📦 All Formats: Get all 3 files at once",
-        reply_markup=reply_markup
+    return InlineKeyboardMarkup(keyboard)
+
+def document_caption(format_name, icon, nid):
+    return f"{icon} Successfully extracted <b>{format_name.replace('_', ' ')}</b> for Test NID <code>{nid}</code>"
+
+async def deliver_documents(bot, chat_id, nid, title, formats_to_generate, data, syllabus_html, timings):
+    """
+    Sends the requested formats of one test to chat_id and returns how many were sent.
+    A document whose render key matches a stored file_id is resent by file_id, with no
+    rendering and no upload; the rest are rendered in a worker process and uploaded, and
+    their file_ids stored. Several formats are sent as one media group. If Telegram
+    rejects a stored file_id, the stored ones are dropped and everything is uploaded afresh.
+    """
+    clean_title = re.sub(r'[^\w\s\-\.]', '', title).strip().replace(' ', '_')
+    file_id_cache = get_file_id_cache()
+    question_digests = [question_digest(q) for q in data]
+    render_keys = {
+        name: document_render_key(name, title, syllabus_html, question_digests) for name, _ in formats_to_generate
+    }
+    file_ids = {}
+    for name, _ in formats_to_generate:
+        file_id = await asyncio.to_thread(file_id_cache.get, nid, name, render_keys[name])
+        if file_id:
+            file_ids[name] = file_id
+
+    documents = {}
+
+    async def render(format_names):
+        rendered, render_timings = await timed_stage(
+            timings, "render_total", render_documents_async(data, syllabus_html, title, format_names)
+        )
+        timings.update(render_timings)
+        documents.update(rendered)
+
+    to_render = [name for name, _ in formats_to_generate if name not in file_ids]
+    if to_render:
+        await render(to_render)
+
+    def document_media(format_name):
+        """The stored file_id, or the rendered document as an in-memory file."""
+        if format_name in file_ids:
+            return file_ids[format_name], None
+        html_file = BytesIO(documents[format_name].encode('utf-8'))
+        html_file.name = f"{clean_title}_{format_name}_{nid}.html"
+        return html_file, html_file.name
+
+    async def send():
+        if len(formats_to_generate) == 1:
+            format_name, icon = formats_to_generate[0]
+            document, _ = document_media(format_name)
+            return [await bot.send_document(
+                chat_id=chat_id, document=document, caption=document_caption(format_name, icon, nid), parse_mode='HTML'
+            )]
+        # Several formats go out as one album: a single request instead of one round trip per file
+        media = []
+        for format_name, icon in formats_to_generate:
+            document, file_name = document_media(format_name)
+            media.append(InputMediaDocument(
+                document, caption=document_caption(format_name, icon, nid), parse_mode='HTML', filename=file_name
+            ))
+        return await bot.send_media_group(chat_id=chat_id, media=media)
+
+    upload_started = time.perf_counter()
+    try:
+        messages = await send()
+    except BadRequest as e:
+        if not file_ids:
+            raise
+        logger.warning(f"Stored file_ids for NID {nid} were rejected ({e}); uploading again")
+        for format_name in file_ids:
+            await asyncio.to_thread(file_id_cache.drop, nid, format_name)
+        file_ids.clear()
+        await render([name for name, _ in formats_to_generate if name not in documents])
+        messages = await send()
+    timings["upload"] = time.perf_counter() - upload_started
+
+    for (format_name, _), message in zip(formats_to_generate, messages):
+        if format_name not in file_ids and message.document:
+            await asyncio.to_thread(
+                file_id_cache.put, nid, format_name, render_keys[format_name], message.document.file_id
+            )
+    return len(messages)
+
+# Compressed archive delivery (format choices ending in ZIP_SUFFIX)
+ARCHIVE_COMPRESSLEVEL = int(os.environ.get("ARCHIVE_COMPRESSLEVEL", 9))  # zlib level, 1 (fast) to 9 (small)
+
+def format_size(num_bytes: int) -> str:
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.1f} MB"
+    return f"{num_bytes / 1024:.0f} KB"
+
+def build_archive(files):
+    """Zips [(file_name, text), ...] in memory; returns (zip bytes, total uncompressed bytes)."""
+    buffer = BytesIO()
+    uncompressed = 0
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=ARCHIVE_COMPRESSLEVEL) as archive:
+        for file_name, text in files:
+            data = text.encode('utf-8')
+            uncompressed += len(data)
+            archive.writestr(file_name, data)
+    return buffer.getvalue(), uncompressed
+
+async def deliver_archive(bot, chat_id, nid, title, formats_to_generate, data, syllabus_html, timings):
+    """
+    Sends the requested formats of one test as a single deflate-compressed ZIP, with the
+    compressed and uncompressed sizes in its caption. Like deliver_documents, an
+    unchanged archive is resent by its stored file_id (the size report is kept with it).
+    """
+    clean_title = re.sub(r'[^\w\s\-\.]', '', title).strip().replace(' ', '_')
+    format_names = [name for name, _ in formats_to_generate]
+    archive_name = "+".join(format_names) + ".zip"
+    label = "All_Formats" if len(format_names) == len(RENDER_FORMATS) else "+".join(format_names)
+    file_id_cache = get_file_id_cache()
+    render_key = document_render_key(
+        f"{archive_name}@{ARCHIVE_COMPRESSLEVEL}", title, syllabus_html, [question_digest(q) for q in data]
     )
-    return CHOOSE_FORMAT
+
+    def caption(size_note):
+        return (
+            f"🗜 Successfully extracted <b>{label.replace('_', ' ').replace('+', ' + ')} (ZIP)</b> "
+            f"for Test NID <code>{nid}</code>\n{size_note}"
+        )
+
+    upload_started = time.perf_counter()
+    cached = await asyncio.to_thread(file_id_cache.get, nid, archive_name, render_key, True)
+    if cached:
+        file_id, size_note = cached
+        try:
+            await bot.send_document(chat_id=chat_id, document=file_id, caption=caption(size_note), parse_mode='HTML')
+            timings["upload"] = time.perf_counter() - upload_started
+            return 1
+        except BadRequest as e:
+            logger.warning(f"Stored file_id for NID {nid} {archive_name} was rejected ({e}); uploading again")
+            await asyncio.to_thread(file_id_cache.drop, nid, archive_name)
+
+    documents, render_timings = await timed_stage(
+        timings, "render_total", render_documents_async(data, syllabus_html, title, format_names)
+    )
+    timings.update(render_timings)
+
+    started = time.perf_counter()
+    archive_bytes, uncompressed = await asyncio.to_thread(
+        build_archive, [(f"{clean_title}_{name}_{nid}.html", html) for name, html in documents]
+    )
+    timings["compress"] = time.perf_counter() - started
+    size_note = (
+        f"📦 {format_size(len(archive_bytes))} instead of {format_size(uncompressed)} "
+        f"({100 - 100 * len(archive_bytes) // max(uncompressed, 1)}% smaller)"
+    )
+
+    upload_started = time.perf_counter()
+    archive_file = BytesIO(archive_bytes)
+    archive_file.name = f"{clean_title}_{label}_{nid}.zip"
+    message = await bot.send_document(chat_id=chat_id, document=archive_file, caption=caption(size_note), parse_mode='HTML')
+    timings["upload"] = time.perf_counter() - upload_started
+    if message.document:
+        await asyncio.to_thread(
+            file_id_cache.put, nid, archive_name, render_key, message.document.file_id, size_note
+        )
+    return 1
 
 async def handle_format_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handles the format selection and generates files."""
@@ -1801,18 +3440,72 @@ async def handle_format_choice(update: Update, context: ContextTypes.DEFAULT_TYP
         return ConversationHandler.END
         
     format_choice = query.data
+    if format_choice in ("zip_on", "zip_off"):
+        await query.edit_message_reply_markup(reply_markup=format_menu(zip_archive=format_choice == "zip_on"))
+        return CHOOSE_FORMAT
     
     # Send initial processing message
     loading_message = await query.edit_message_text("⚙️ Processing your request... This may take a moment due to network conditions... ⏳")
 
-    if not check_internet_connection():
+    if not network_available():
         await query.edit_message_text("🌐 Network connectivity lost. Please check your internet connection and try again. 🔄")
         return ConversationHandler.END
-        
+
+    # The extraction owns the prefetch from here on, so a new /extract by the same user
+    # cannot cancel it, and it runs in the background so the next update is handled at once
+    prefetch = pop_prefetch(context)
+    context.application.create_task(
+        run_extraction(context, query.message.chat_id, loading_message, nid, format_choice, prefetch), update=update
+    )
+    return ConversationHandler.END
+
+# Extractions run as background tasks, at most EXTRACTION_WORKERS at a time; the rest wait
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", 4))
+EXTRACTION_STATS = {"running": 0, "queued": 0}
+
+_extraction_slots = None
+
+def get_extraction_slots() -> asyncio.Semaphore:
+    """Return the extraction semaphore, creating it on first use (inside the running loop)."""
+    global _extraction_slots
+    if _extraction_slots is None:
+        _extraction_slots = asyncio.Semaphore(EXTRACTION_WORKERS)
+    return _extraction_slots
+
+async def run_extraction(context, chat_id, loading_message, nid, format_choice, prefetch=None) -> None:
+    """Fetches, renders and sends one extraction, waiting for a free extraction slot first."""
+    slots = get_extraction_slots()
+    if slots.locked():
+        EXTRACTION_STATS["queued"] += 1
+        try:
+            await loading_message.edit_text(
+                f"⏳ All {EXTRACTION_WORKERS} extraction slots are busy; yours will start shortly..."
+            )
+        except TelegramError as e:
+            logger.warning(f"Could not show the queued status for NID {nid}: {e}")
+        try:
+            await slots.acquire()
+        finally:
+            EXTRACTION_STATS["queued"] -= 1
+    else:
+        await slots.acquire()
+    EXTRACTION_STATS["running"] += 1
     try:
-        # 1. Fetch metadata and question data
-        test_metadata = fetch_test_metadata(nid)
-        data = fetch_locale_json_from_api(nid)
+        await extract_and_send(context, chat_id, loading_message, nid, format_choice, prefetch)
+    finally:
+        EXTRACTION_STATS["running"] -= 1
+        slots.release()
+
+async def extract_and_send(context, chat_id, loading_message, nid, format_choice, prefetch=None) -> None:
+    """
+    The extraction itself: progress and errors are reported by editing loading_message.
+    prefetch is the user's prefetch entry taken over by handle_format_choice, if any.
+    """
+    timings = {}
+    extraction_started = time.perf_counter()
+    try:
+        # 1. Fetch metadata and question data concurrently
+        test_metadata, data = await timed_stage(timings, "fetch", get_extraction_data(prefetch, nid, timings))
         
         if not data:
             await loading_message.edit_text(
@@ -1824,52 +3517,40 @@ async def handle_format_choice(update: Update, context: ContextTypes.DEFAULT_TYP
                 "🔄 Please verify the NID and try again later.",
                 parse_mode='HTML'
             )
-            return ConversationHandler.END
+            return
 
-        # 2. Extract title and generate Syllabus HTML (passes both metadata and question data for rich syllabus)
+        # 2. Extract title
         title = test_metadata.get("title", f"Test {nid}").strip() if test_metadata else f"Test {nid}"
-        syllabus_html = generate_syllabus_html_box(test_metadata, data) # Pass metadata and question data
-
-        # 3. Clean title for filename
-        clean_title = re.sub(r'[^\w\s\-\.]', '', title).strip().replace(' ', '_')
 
-        # 4. Define formats to generate
+        # 3. Define formats to generate
+        archive = format_choice.endswith(ZIP_SUFFIX)
+        if archive:
+            format_choice = format_choice[:-len(ZIP_SUFFIX)]
         formats_to_generate = []
         if format_choice == "questions_only":
-            formats_to_generate.append(("Questions_Only", generate_questions_only_html, "📝"))
+            formats_to_generate.append(("Questions_Only", "📝"))
         elif format_choice == "questions_answers":
-            formats_to_generate.append(("Questions_Answers", generate_questions_answers_only_html, "✅"))
+            formats_to_generate.append(("Questions_Answers", "✅"))
         elif format_choice == "questions_solutions":
-            formats_to_generate.append(("Questions_Solutions", generate_questions_with_answers_html, "📖"))
+            formats_to_generate.append(("Questions_Solutions", "📖"))
         elif format_choice == "all_formats":
-            formats_to_generate.append(("Questions_Only", generate_questions_only_html, "📝"))
-            formats_to_generate.append(("Questions_Answers", generate_questions_answers_only_html, "✅"))
-            formats_to_generate.append(("Questions_Solutions", generate_questions_with_answers_html, "📖"))
+            formats_to_generate.append(("Questions_Only", "📝"))
+            formats_to_generate.append(("Questions_Answers", "✅"))
+            formats_to_generate.append(("Questions_Solutions", "📖"))
         else:
             await loading_message.edit_text("❌ Invalid format choice. Please start over with /start.")
-            return ConversationHandler.END
+            return
 
-        # 5. Generate and send files
-        sent_files = 0
-        for format_name, generator_func, icon in formats_to_generate:
-            # Pass the question data, title, and syllabus_html to the generator function
-            html_content = generator_func(data, title, syllabus_html) 
-            
-            # Create a virtual file in memory
-            html_file = BytesIO(html_content.encode('utf-8'))
-            file_name = f"{clean_title}_{format_name}_{nid}.html"
-            html_file.name = file_name
-            
-            # Send the file
-            await context.bot.send_document(
-                chat_id=query.message.chat_id,
-                document=html_file,
-                caption=f"{icon} Successfully extracted <b>{format_name.replace('_', ' ')}</b> for Test NID <code>{nid}</code>",
-                parse_mode='HTML'
-            )
-            sent_files += 1
+        # 4. Build the syllabus, then render (or reuse) and send the documents
+        started = time.perf_counter()
+        syllabus_html = get_syllabus_html(nid, test_metadata, data)
+        timings["syllabus"] = time.perf_counter() - started
+        deliver = deliver_archive if archive else deliver_documents
+        sent_files = await deliver(
+            context.bot, chat_id, nid, title, formats_to_generate, data, syllabus_html, timings
+        )
 
-        # 6. Final message
+        # 5. Final message
         final_message = (
             f"🎉 <b>Extraction Complete!</b>\n\n"
             f"✅ Sent <b>{sent_files}</b> file(s) for test <code>{nid}</code>: <b>{title}</b>.\n\n"
@@ -1888,13 +3569,14 @@ async def handle_format_choice(update: Update, context: ContextTypes.DEFAULT_TYP
             )
         except Exception as edit_error:
              logger.error(f"Failed to edit message with error: {edit_error}")
-
-
-    return ConversationHandler.END
+    finally:
+        timings["total"] = time.perf_counter() - extraction_started
+        log_stage_timings(nid, timings)
 
 
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancels and ends the conversation."""
+    cancel_prefetch(context)
     await update.message.reply_text(
         '👋 Operation cancelled. Back to the main menu with /start.',
         parse_mode='MarkdownV2'
@@ -1902,25 +3584,25 @@ async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return ConversationHandler.END
 
 
-def main() -> None:
-    """Start the bot."""
-    
-    # 1. Check for basic connectivity
-    if not check_internet_connection():
-        logger.error("No internet connection detected. Bot cannot start.")
-        print("FATAL ERROR: No internet connection detected. Bot cannot start.")
-        return
-
-    # 2. Check Telegram API accessibility
-    if not test_telegram_api(BOT_TOKEN):
-        logger.error("Telegram API is inaccessible or Bot Token is invalid.")
-        print("FATAL ERROR: Telegram API is inaccessible or Bot Token is invalid.")
-        return
-
-    logger.info("Starting Telegram Bot Application...")
-
-    # Create the Application and pass it your bot's token.
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
+# Update delivery: "polling" (default) or "webhook". In webhook mode an embedded aiohttp server
+# receives updates over plain HTTP; TLS is terminated by a reverse proxy in front of it.
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8080))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")  # Public https URL the proxy forwards to WEBHOOK_PATH
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")  # Random per start when unset
+
+def build_application():
+    """Creates the Application with all handlers registered."""
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .base_url(TELEGRAM_API_BASE_URL)
+        .post_init(startup_resources)
+        .post_shutdown(shutdown_resources)
+        .build()
+    )
 
     # Conversation Handler for main menu, extraction, and authorization
     conv_handler = ConversationHandler(
@@ -1932,7 +3614,7 @@ def main() -> None:
         states={
             ASK_NID: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_nid)],
             CHOOSE_FORMAT: [CallbackQueryHandler(handle_format_choice)],
-            ASK_INFO_NID: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_info_nid)],
+            ASK_INFO_NID: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_info_nid, block=False)],
             ASK_AUTH_USER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_auth_user_id)],
         },
         fallbacks=[CommandHandler("cancel", cancel_command), MessageHandler(filters.COMMAND, start)],
@@ -1941,16 +3623,114 @@ def main() -> None:
     application.add_handler(conv_handler)
     
     # Other handlers (non-conversation)
-    application.add_handler(CommandHandler("info", info_command))
+    # /info lookups wait on the upstream, so they must not hold up the update queue
+    application.add_handler(CommandHandler("info", info_command, block=False))
     application.add_handler(CommandHandler("listusers", list_users_command))
     application.add_handler(CommandHandler("removeuser", remove_user_command))
+    application.add_handler(CommandHandler("stats", stats_command))
     
     # Callback handlers for menu navigation (outside of conversation states)
     application.add_handler(CallbackQueryHandler(handle_back_to_menu, pattern="^back_to_menu$"))
     # Handle the main menu buttons when clicked outside the conversation flow (if user exits via /cancel)
     application.add_handler(CallbackQueryHandler(handle_main_menu, pattern="^extract_test$|^get_info$|^help$"))
+    return application
+
+def webhook_handler(application, secret):
+    """aiohttp handler that checks Telegram's secret token header and queues the posted update."""
+    async def receive_update(request):
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        # Constant-time comparison, so response timing does not reveal the secret
+        if not secrets.compare_digest(token.encode(), secret.encode()):
+            return web.Response(status=403)
+        try:
+            payload = await request.json()
+            # Anything but a JSON object describing an update is a bad request, not a server error
+            update = Update.de_json(payload, application.bot) if isinstance(payload, dict) else None
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+        await application.update_queue.put(update)
+        return web.Response()
+    return receive_update
+
+async def serve_webhook(application, stop_event=None) -> bool:
+    """
+    Registers WEBHOOK_URL with Telegram and serves updates on WEBHOOK_LISTEN:WEBHOOK_PORT
+    until SIGINT/SIGTERM (or stop_event). Returns False without serving if Telegram
+    refuses the webhook, so the caller can fall back to polling.
+    """
+    secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    await application.initialize()
+    try:
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL, secret_token=secret, allowed_updates=Update.ALL_TYPES
+        )
+    except TelegramError as e:
+        logger.error(f"Could not register webhook {WEBHOOK_URL}: {e}")
+        await application.shutdown()
+        return False
+
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    web_app = web.Application()
+    web_app.router.add_post(WEBHOOK_PATH, webhook_handler(application, secret))
+    runner = web.AppRunner(web_app)
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_LISTEN, WEBHOOK_PORT).start()
+        logger.info(f"Serving webhook {WEBHOOK_URL} on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+        await stop_event.wait()
+    finally:
+        # The webhook stays registered: Telegram holds updates while the bot restarts
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    return True
+
+def main() -> None:
+    """Start the bot."""
+    
+    # 1. Check for basic connectivity (once, before the event loop starts; handlers use HEALTH_STATE)
+    if not check_internet_connection():
+        logger.error("No internet connection detected. Bot cannot start.")
+        print("FATAL ERROR: No internet connection detected. Bot cannot start.")
+        return
+
+    # 2. Check Telegram API accessibility
+    if not test_telegram_api(BOT_TOKEN):
+        logger.error("Telegram API is inaccessible or Bot Token is invalid.")
+        print("FATAL ERROR: Telegram API is inaccessible or Bot Token is invalid.")
+        return
+
+    logger.info("Starting Telegram Bot Application...")
+
+    # Create the Application and pass it your bot's token.
+    application = build_application()
+
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            logger.warning("BOT_MODE=webhook but WEBHOOK_URL is not set; falling back to polling")
+        elif asyncio.run(serve_webhook(application)):
+            return
+        else:
+            logger.warning("Falling back to polling")
+            asyncio.set_event_loop(asyncio.new_event_loop())  # asyncio.run closed the previous one
+            application = build_application()
     
-    # Run the bot until the user presses Ctrl-C
+    # Run the bot until the user presses Ctrl-C (polling deletes any registered webhook first)
     try:
         application.run_polling(poll_interval=1, allowed_updates=Update.ALL_TYPES)
     except Conflict:
@@ -0,0 +1,47 @@
+"""
+Runs the real bot against the stand-ins in fake_telegram.py and fake_upstream.py:
+point_bot_at() redirects info to them, start_webhook() serves webhook updates locally.
+Shared by the tests (through the configure fixture in conftest.py) and the load benchmark.
+"""
+import asyncio
+import socket
+
+import info
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def point_bot_at(monkeypatch, api, upstream=None, cache_dir=None):
+    """
+    Points the bot at a FakeBotApi (and a FakeUpstream, if given) with its webhook
+    listener on a free local port. monkeypatch is pytest's fixture, or a
+    pytest.MonkeyPatch() outside tests.
+    """
+    port = free_port()
+    monkeypatch.setattr(info, "TELEGRAM_API_BASE_URL", api.base_url)
+    monkeypatch.setattr(info, "WEBHOOK_LISTEN", "127.0.0.1")
+    monkeypatch.setattr(info, "WEBHOOK_PORT", port)
+    monkeypatch.setattr(info, "WEBHOOK_URL", f"http://127.0.0.1:{port}{info.WEBHOOK_PATH}")
+    monkeypatch.setattr(info, "run_health_monitor", lambda: asyncio.sleep(0))  # No probes against the real hosts
+    if upstream is not None:
+        monkeypatch.setattr(info, "UPSTREAM_BASE_URL", upstream.base_url)
+        monkeypatch.setattr(info, "upstream_rate_limiter", info.TokenBucket(1000, 1000))
+    if cache_dir is not None:
+        monkeypatch.setattr(info, "CACHE_DIR", cache_dir)
+        monkeypatch.setenv("CACHE_DIR", cache_dir)  # Read by the spawned render workers
+
+async def start_webhook(api, application):
+    """Starts info.serve_webhook; returns (stop event, serve task) once the listener accepts connections."""
+    stop = asyncio.Event()
+    task = asyncio.create_task(info.serve_webhook(application, stop))
+    await api.wait_for(lambda: api.webhook)
+    # The listener starts right after setWebhook returns
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", info.WEBHOOK_PORT), timeout=0.1):
+                break
+        except OSError:
+            await asyncio.sleep(0.02)
+    return stop, task
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The bot is a single module at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_harness import point_bot_at
+
+@pytest.fixture
+def configure(monkeypatch, tmp_path):
+    """apply(api, upstream=None) points the bot at the stand-ins (see bot_harness.point_bot_at)."""
+    def apply(api, upstream=None):
+        point_bot_at(monkeypatch, api, upstream, str(tmp_path))
+    return apply
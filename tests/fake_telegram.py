@@ -0,0 +1,152 @@
+"""
+Stand-in for the Telegram Bot API, served by aiohttp on localhost. It implements just
+enough of the methods the bot calls (messages, documents, media groups, webhooks) to run
+the real Application against it, and records every call in FakeBotApi.calls.
+Point the bot at it with info.TELEGRAM_API_BASE_URL = fake.base_url.
+"""
+import asyncio
+import itertools
+import json
+
+import aiohttp
+from aiohttp import web
+
+# Answers of the form {"ok": true, "result": true}
+PLAIN_METHODS = ("deleteWebhook", "answerCallbackQuery", "deleteMessage", "sendChatAction")
+
+class FakeBotApi:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.calls = []  # (method, params) in arrival order
+        self.files = {}  # file_id -> uploaded bytes
+        self.webhook = {}  # url/secret registered through setWebhook
+        self.latency = 0.0  # Seconds each API call takes
+        self._ids = itertools.count(1)
+        self._runner = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        app = web.Application(client_max_size=100 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def called(self, method):
+        """Parameters of every recorded call of method."""
+        return [params for name, params in self.calls if name == method]
+
+    async def wait_for(self, predicate, timeout=10):
+        """Waits until predicate() is true, polling the recorded calls."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not predicate():
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError("the bot did not make the expected API calls")
+            await asyncio.sleep(0.01)
+
+    async def post_update(self, update, secret=None):
+        """Delivers an update the way Telegram does: POST to the webhook with the secret header."""
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self.webhook["secret"] if secret is None else secret}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(self.webhook["url"], data=json.dumps(update), headers=headers) as response:
+                return response.status
+
+    def message(self, chat_id, **fields):
+        return {"message_id": next(self._ids), "date": 0, "chat": {"id": chat_id, "type": "private"}, **fields}
+
+    def document_message(self, chat_id, file_id, file_name):
+        return self.message(chat_id, document={"file_id": file_id, "file_unique_id": file_id, "file_name": file_name})
+
+    async def read_params(self, request):
+        """Request parameters as {name: value}; uploaded files become (bytes, filename) tuples."""
+        if request.content_type == "application/json":
+            return await request.json()
+        if not request.content_type.startswith("multipart/"):
+            return dict(await request.post())
+        params = {}
+        async for part in await request.multipart():
+            data = await part.read()
+            params[part.name] = (data, part.filename) if part.filename else data.decode()
+        return params
+
+    def store_file(self, params, ref):
+        """Resolves a document reference (upload, attach:// or file_id) to (file_id, file_name)."""
+        if isinstance(ref, str) and ref.startswith("attach://"):
+            ref = params[ref[len("attach://"):]]
+        if isinstance(ref, tuple):
+            file_id = f"F{next(self._ids)}"
+            self.files[file_id] = ref[0]
+            return file_id, ref[1]
+        if ref not in self.files:
+            raise KeyError(ref)
+        return ref, None
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        params = await self.read_params(request)
+        self.calls.append((method, params))
+        await asyncio.sleep(self.latency)
+        chat_id = int(params.get("chat_id", 1))
+        try:
+            if method == "getMe":
+                result = {"id": 1, "is_bot": True, "first_name": "Bot", "username": "bot"}
+            elif method == "setWebhook":
+                if not params["url"].startswith(("https://", "http://127.0.0.1")):
+                    return self.error(400, "Bad Request: bad webhook: HTTPS url must be provided for webhook")
+                self.webhook.update(url=params["url"], secret=params.get("secret_token"))
+                result = True
+            elif method in ("sendMessage", "editMessageText"):
+                result = self.message(chat_id, text=params.get("text", ""))
+            elif method == "editMessageReplyMarkup":
+                result = self.message(chat_id, text="menu", reply_markup=json.loads(params["reply_markup"]))
+            elif method == "sendDocument":
+                result = self.document_message(chat_id, *self.store_file(params, params["document"]))
+            elif method == "sendMediaGroup":
+                media = json.loads(params["media"])
+                result = [self.document_message(chat_id, *self.store_file(params, m["media"])) for m in media]
+            elif method in PLAIN_METHODS:
+                result = True
+            else:
+                return self.error(404, "Not Found")
+        except KeyError:
+            return self.error(400, "Bad Request: wrong file identifier/http url specified")
+        return web.json_response({"ok": True, "result": result})
+
+    @staticmethod
+    def error(code, description):
+        return web.json_response({"ok": False, "error_code": code, "description": description}, status=code)
+
+def command_update(update_id, user_id, text):
+    """An update carrying a private text message from user_id (a bot command if text starts with /)."""
+    message = {
+        "message_id": update_id, "date": 0, "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "User"}, "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+def callback_update(update_id, user_id, data, message_id=1):
+    """An update carrying an inline keyboard button press from user_id."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "chat_instance": "1", "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "message": {
+                "message_id": message_id, "date": 0, "chat": {"id": user_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "Bot"}, "text": "menu",
+            },
+        },
+    }
@@ -0,0 +1,63 @@
+"""
+Stand-in for the learn.aakashitutor.com endpoints the bot reads (test metadata and
+locale questions), served by aiohttp on localhost with configurable response delays.
+Point the bot at it with info.UPSTREAM_BASE_URL = fake.base_url.
+"""
+import asyncio
+
+from aiohttp import web
+
+def question(i):
+    """One upstream question record: the English (843) version plus a Hindi one."""
+    return {
+        "843": {
+            "body": f"<p>Q{i}: H<sub>2</sub>O &amp; x<sup>2</sup></p>",
+            "alternatives": [{"answer": f"option {j}", "score_if_chosen": "1" if j == 0 else "0"} for j in range(4)],
+            "detailed_solution": "Solution\\n<b>x</b>",
+            "subject_name": "Physics", "chapter_name": "Kinematics", "topic_name": f"Motion {i % 3}",
+        },
+        "844": {"body": "hindi", "alternatives": []},
+    }
+
+METADATA = {
+    "title": "Demo Test", "description": "Demo description", "syllabus": "<p>Syllabus</p>",
+    "quiz_open": "1700000000", "quiz_close": "1700003600", "show_results": "1700007200",
+}
+
+class FakeUpstream:
+    def __init__(self, questions=5, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.payload = {str(1000 + i): question(i) for i in range(questions)}
+        self.delay = {"questions": 0.0, "metadata": 0.0}  # Seconds before each answer
+        self.calls = {"questions": 0, "metadata": 0}
+        self._runner = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/quiz/{nid}/getlocalequestions", self.questions)
+        app.router.add_get("/api/getquizfromid", self.metadata)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def questions(self, request):
+        self.calls["questions"] += 1
+        await asyncio.sleep(self.delay["questions"])
+        return web.json_response(self.payload)
+
+    async def metadata(self, request):
+        self.calls["metadata"] += 1
+        await asyncio.sleep(self.delay["metadata"])
+        return web.json_response([dict(METADATA, title=f"Demo Test {request.query.get('nid')}")])
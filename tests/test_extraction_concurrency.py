@@ -0,0 +1,117 @@
+"""
+Background extractions against the stand-in Bot API and upstream: /info stays responsive
+while extractions wait on the upstream, and a queued extraction never touches the
+prefetch of the user's next /extract. Also the format menu's ZIP toggle.
+"""
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+import info
+from bot_harness import start_webhook
+from fake_telegram import FakeBotApi, callback_update, command_update
+from fake_upstream import FakeUpstream
+
+USER_ID = info.AUTHORIZED_USER_IDS[0]
+
+@pytest.fixture(autouse=True)
+def one_worker_each(monkeypatch):
+    monkeypatch.setattr(info, "RENDER_WORKERS", 1)
+    monkeypatch.setattr(info, "EXTRACTION_WORKERS", 1)
+    monkeypatch.setattr(info, "_extraction_slots", None)
+    monkeypatch.setattr(info, "render_memo_counters", {})
+
+class Session:
+    """A running bot plus helpers to post updates to it."""
+
+    def __init__(self, api, upstream, application):
+        self.api = api
+        self.upstream = upstream
+        self.application = application
+        self._update_ids = iter(range(1, 10 ** 6))
+
+    async def command(self, user_id, text):
+        assert await self.api.post_update(command_update(next(self._update_ids), user_id, text)) == 200
+
+    async def press(self, user_id, data):
+        assert await self.api.post_update(callback_update(next(self._update_ids), user_id, data)) == 200
+
+    async def choose_nid(self, user_id, nid):
+        """/extract, then the NID; returns once the format menu is shown."""
+        menus = len(self.api.called("sendMessage"))
+        await self.command(user_id, "/extract")
+        await self.command(user_id, nid)
+        await self.api.wait_for(lambda: len(self.api.called("sendMessage")) >= menus + 2)
+
+async def run_session(configure, scenario):
+    api = await FakeBotApi().start()
+    upstream = await FakeUpstream().start()
+    configure(api, upstream)
+    application = info.build_application()
+    stop, server = await start_webhook(api, application)
+    try:
+        await scenario(Session(api, upstream, application))
+    finally:
+        stop.set()
+        await server
+        await upstream.close()
+        await api.close()
+
+def test_info_is_answered_while_extractions_wait(configure):
+    async def scenario(session):
+        session.upstream.delay["questions"] = 2
+        for user_id in info.AUTHORIZED_USER_IDS[:3]:
+            await session.choose_nid(user_id, f"{4000 + user_id % 1000}")
+            await session.press(user_id, "questions_only")
+
+        await session.command(USER_ID, "/info 77")
+        await session.api.wait_for(
+            lambda: any("Demo Test 77" in c["text"] for c in session.api.called("editMessageText")), timeout=1
+        )
+        assert not session.api.called("sendDocument")
+        await session.api.wait_for(lambda: len(session.api.called("sendDocument")) == 3, timeout=30)
+        # The render workers report their fragment memo counters for /stats
+        (entries, hits, misses), = {c["process_html_content"] for c in info.render_memo_counters.values()}
+        assert entries and misses
+    asyncio.run(run_session(configure, scenario))
+
+def test_queued_extraction_leaves_the_next_prefetch_alone(configure):
+    async def scenario(session):
+        slots = info.get_extraction_slots()
+        await slots.acquire()  # Keep the only extraction slot busy
+        await session.choose_nid(USER_ID, "111")
+        await session.press(USER_ID, "questions_only")
+        await session.api.wait_for(lambda: info.EXTRACTION_STATS["queued"] == 1)
+
+        # The user moves on to another test while the first extraction is queued
+        session.upstream.delay["questions"] = 1
+        await session.choose_nid(USER_ID, "222")
+        prefetch = session.application.user_data[USER_ID]["prefetch"]
+        assert prefetch["nid"] == "222"
+
+        slots.release()
+        await session.api.wait_for(lambda: session.api.called("sendDocument"), timeout=30)
+        assert "<code>111</code>" in session.api.called("sendDocument")[0]["caption"]
+        assert session.application.user_data[USER_ID].get("prefetch") is prefetch
+        assert await prefetch["task"] is not None
+    asyncio.run(run_session(configure, scenario))
+
+def test_zip_toggle_sends_one_format_as_archive(configure):
+    async def scenario(session):
+        await session.choose_nid(USER_ID, "333")
+        await session.press(USER_ID, "zip_on")
+        await session.api.wait_for(lambda: session.api.called("editMessageReplyMarkup"))
+        menu = json.loads(session.api.called("editMessageReplyMarkup")[0]["reply_markup"])
+        buttons = menu["inline_keyboard"]
+        assert buttons[0][0]["callback_data"] == "questions_only_zip"
+
+        await session.press(USER_ID, "questions_only_zip")
+        await session.api.wait_for(lambda: session.api.called("sendDocument"), timeout=30)
+        (sent,) = session.api.called("sendDocument")
+        data, file_name = sent["document"]
+        assert file_name == "Demo_Test_333_Questions_Only_333.zip"
+        assert zipfile.ZipFile(io.BytesIO(data)).namelist() == ["Demo_Test_333_Questions_Only_333.html"]
+    asyncio.run(run_session(configure, scenario))
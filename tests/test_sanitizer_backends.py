@@ -0,0 +1,110 @@
+"""
+Corpus comparison of the two sanitizer backends: lxml's output must describe the same
+document as html.parser's. Known serialization differences are pinned down explicitly.
+"""
+import random
+
+import pytest
+from bs4 import BeautifulSoup
+
+import info
+
+pytest.importorskip("lxml")
+
+# Fragments shaped like the upstream's question bodies, options and solutions
+CORPUS = [
+    "Both (1) and (2)",
+    "H<sub>2</sub>O and CO<sub>2</sub>",
+    "<p>Find x<sup>2</sup> &amp; y</p>",
+    "<p>If &alpha; = 30&deg;, then sin &alpha; is</p>",
+    "<img src='//cdn.aakash.ac.in/q/1.png' style='width:120px'>",
+    '<p><img src="https://cdn.example.com/a.png" alt="fig"></p>',
+    "P<sub>s</sub> and P<sup>0</sup>",
+    "a &nbsp; b &lt; c &gt; d",
+    "<span style=\"font-family:Times\">K<sub>c</sub> = [A]<sup>2</sup>/[B]</span>",
+    "<table><tr><td>Column I</td><td>Column II</td></tr><tr><td>(a)</td><td>(i)</td></tr></table>",
+    "<ol><li>Statement I</li><li>Statement II</li></ol>",
+    "<p><strong>Correct answer:</strong> <em>(3)</em></p>",
+    "<math xmlns=\"http://www.w3.org/1998/Math/MathML\"><mi>x</mi><mo>=</mo><mn>2</mn></math>",
+    "<div><p>unclosed paragraph",
+    "text with a stray </b> end tag",
+    "<!-- upstream comment --><p>S</p>",
+    "<p>é − ×</p>",
+    "<html><body><p>wrapped</p></body></html>",
+    "<html><head><title>x</title></head><body><p>S</p></body></html>",
+    "<HEAD><title>x</title></HEAD>S",
+    # Inline tags wrapping blocks, and head content without a <head>
+    "<b><p>Assertion</p></b>",
+    "<u><p>Statement I</p><p>Statement II</p></u>",
+    "<i><p>a</i>b",
+    "<html><title>T</title><p>S</p></html>",
+    "<html><style>p { color: red }</style><body><p>S</p></body></html>",
+    "<meta charset=\"utf-8\"><p>S</p>",
+]
+
+TEXT = ["Both (1) and (2)", "x", "text ", "(A)", "&nbsp;", "&amp;", "&lt;", "&rarr;", "&#8594;", "é", "<br>",
+        "<img src='//cdn.aakash.ac.in/q/1.png' style='width:120px'>"]
+INLINE = ["b", "i", "u", "strong", "sub", "sup", "span style=\"font-family:Times\""]
+
+def random_markup(rng, depth=0, block=True):
+    """Random well-nested markup; inline elements may wrap blocks, paragraphs may not."""
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        kind = rng.random()
+        if depth >= 3 or kind < 0.4:
+            parts.append(rng.choice(TEXT))
+        elif kind < 0.7 or not block:
+            tag = rng.choice(INLINE)
+            parts.append(f"<{tag}>{random_markup(rng, depth + 1, block)}</{tag.split()[0]}>")
+        elif kind < 0.8:
+            parts.append(f"<p>{random_markup(rng, depth + 1, block=False)}</p>")
+        elif kind < 0.9:
+            parts.append(f"<div>{random_markup(rng, depth + 1)}</div>")
+        else:
+            parts.append(f"<table><tr><td>{random_markup(rng, depth + 1)}</td></tr></table>")
+    return "".join(parts)
+
+def random_corpus(count, seed=3):
+    rng = random.Random(seed)
+    return [random_markup(rng) for _ in range(count)]
+
+def soup_tree(markup):
+    """The document tree html.parser builds from markup, whitespace-normalized."""
+    def walk(node):
+        if isinstance(node, str):
+            return " ".join(node.split())
+        attrs = tuple(sorted((k, v if isinstance(v, str) else " ".join(v)) for k, v in node.attrs.items()))
+        return (node.name, attrs, tuple(x for x in (walk(c) for c in node.children) if x != ""))
+    return walk(BeautifulSoup(markup, "html.parser"))
+
+@pytest.mark.parametrize("fragment", CORPUS)
+def test_backends_build_the_same_tree(fragment):
+    lxml_out = info.rewrite_html_fragment(fragment, backend="lxml")
+    parser_out = info.rewrite_html_fragment(fragment, backend="html.parser")
+    assert soup_tree(lxml_out) == soup_tree(parser_out)
+
+def test_random_fragments_build_the_same_tree():
+    for fragment in random_corpus(2000):
+        lxml_out = info.rewrite_html_fragment(fragment, backend="lxml")
+        parser_out = info.rewrite_html_fragment(fragment, backend="html.parser")
+        assert soup_tree(lxml_out) == soup_tree(parser_out), fragment
+
+def test_head_content_is_kept():
+    fragment = "<html><head><title>x</title></head><body><p>S</p></body></html>"
+    assert info.rewrite_html_fragment(fragment, backend="lxml") == "<head><title>x</title></head><p>S</p>"
+
+@pytest.mark.parametrize("fragment, lxml_out, parser_out", [
+    # Void elements: HTML vs XHTML-style serialization
+    ("a<br/>b", "a<br>b", "a<br/>b"),
+    ("<img src='//cdn.example.com/a.png'>", '<img src="https://cdn.example.com/a.png">',
+     '<img src="https://cdn.example.com/a.png"/>'),
+    # Doctype declarations inside a fragment are dropped by lxml (browsers ignore them)
+    ("<!DOCTYPE html><p>S</p>", "<p>S</p>", "<!DOCTYPE html>\n<p>S</p>"),
+    # lxml ends a paragraph at a block it contains
+    ("<p>a<table>b</p>", "<p>a</p><table>b</table>", "<p>a<table>b</table></p>"),
+    # html.parser turns a <br> followed by a <br/> into a <br>...</br> container
+    ("<i>a<br>b<br/>c</i>", "<i>a<br>b<br>c</i>", "<i>a<br/>b<br>c</br></i>"),
+])
+def test_known_serialization_differences(fragment, lxml_out, parser_out):
+    assert info.rewrite_html_fragment(fragment, backend="lxml") == lxml_out
+    assert info.rewrite_html_fragment(fragment, backend="html.parser") == parser_out
@@ -0,0 +1,41 @@
+"""single_flight: one shared fetch per key, cancelled only when its last caller gives up."""
+import asyncio
+
+import info
+
+def counting_fetch(counts, seconds=0.5):
+    async def fetch():
+        counts["started"] += 1
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            counts["cancelled"] += 1
+            raise
+        return counts["started"]
+    return fetch
+
+def test_fetch_survives_while_a_caller_remains():
+    async def scenario():
+        counts = {"started": 0, "cancelled": 0}
+        fetch = counting_fetch(counts)
+        first = asyncio.create_task(info.single_flight(("test", "shared"), fetch))
+        second = asyncio.create_task(info.single_flight(("test", "shared"), fetch))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        assert await second == 1
+        assert counts == {"started": 1, "cancelled": 0}
+    asyncio.run(scenario())
+
+def test_fetch_is_cancelled_with_its_last_caller():
+    async def scenario():
+        counts = {"started": 0, "cancelled": 0}
+        fetch = counting_fetch(counts)
+        caller = asyncio.create_task(info.single_flight(("test", "abandoned"), fetch))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        assert counts == {"started": 1, "cancelled": 1}
+        assert ("test", "abandoned") not in info._inflight_fetches
+        # A later caller starts a fresh fetch instead of joining the cancelled one
+        assert await info.single_flight(("test", "abandoned"), fetch) == 2
+    asyncio.run(scenario())
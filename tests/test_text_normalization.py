@@ -0,0 +1,76 @@
+"""
+Property test for the precompiled text normalization: on randomly generated inputs the
+cleaning functions must return exactly what the previous chain of re.sub/str.replace
+passes (reference copies below) returned.
+"""
+import random
+import re
+
+import pytest
+
+import info
+
+# Reference copies of the functions the precompiled pipeline replaced
+def legacy_clean_text_for_telegram(text):
+    if not text:
+        return "N/A"
+    text = str(text).strip()
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = re.sub(r'\n{2,}', '\n\n', text).strip()
+    text = re.sub(r'<[^>]*>', '', text)
+    text = re.sub(r'&[a-zA-Z0-9#]+;', '', text)
+    text = re.sub(r'[^\w\s\-\.\(\),:\n/]', '', text)
+    text = re.sub(r'\s{2,}', ' ', text).strip()
+    if len(text) > 800:
+        text = text[:797] + "..."
+    return text if text else "N/A"
+
+def legacy_clean_solution_content(content):
+    if not content or content is None:
+        return ""
+    content_str = str(content)
+    content_str = re.sub(r'\{[\'"]nid[\'"]:\s*[\'"][0-9]+[\'"],\s*[\'"]content[\'"]:\s*[\'"]', '', content_str)
+    content_str = re.sub(r',\s*[\'"]clipping_nid[\'"]:\s*None,\s*[\'"]type[\'"]:\s*[\'"]HTML5[\'"],\s*[\'"]duration[\'"]:\s*None\}.*?$', '', content_str)
+    content_str = re.sub(r'\{[^}]*\}', '', content_str)
+    content_str = content_str.replace('\\r\\n', ' ').replace('\\r', ' ').replace('\\n', ' ')
+    content_str = content_str.strip('\'"')
+    content_str = content_str.strip()
+    return content_str
+
+def legacy_process_html_content(html_string):
+    if not html_string or html_string is None:
+        return ""
+    html_str = str(legacy_clean_solution_content(html_string))
+    html_str = html_str.replace('\r', '')
+    html_str = re.sub(r'\n+', ' ', html_str)
+    html_str = html_str.replace('r/n/r/n', ' ').replace('r/n', ' ')
+    content = info.rewrite_html_fragment(html_str)
+    content = content.replace('P<sub>s</sub>', '<span style="font-size: 18px;">P<sub style="font-size: 14px;">s</sub></span>')
+    content = content.replace('P<sup>0</sup>', '<span style="font-size: 18px;">P<sup style="font-size: 14px;">0</sup></span>')
+    return content.strip()
+
+# Building blocks for inputs: line endings, escapes, tags, entities, JSON artifacts, unicode whitespace
+ATOMS = [
+    "\r", "\n", "\r\n", "\\r", "\\n", "\\r\\n", "r/n", "r/n/r/n", "r", "n", "/", "<", ">", "<b>", "</p>",
+    "&", "&amp;", "&#39;", ";", "#", "a", "Z", "9", " ", "  ", "\t", " ", " ", "{", "}", "'", '"',
+    "{'nid': '12', 'content': '", ", 'clipping_nid': None, 'type': 'HTML5', 'duration': None}x",
+    "é", "µ", "$", "*", "P<sub>s</sub>", "P<sup>0</sup>", "<img src='/a.png'>", ".", "-", "(", ")", ",", ":",
+]
+
+def random_texts(count, seed, max_atoms=40):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(ATOMS) for _ in range(rng.randint(0, max_atoms))) for _ in range(count)]
+
+@pytest.mark.parametrize("new, old, count", [
+    (info.clean_text_for_telegram, legacy_clean_text_for_telegram, 20000),
+    # __wrapped__ bypasses the fragment memo
+    (info.clean_solution_content.__wrapped__, legacy_clean_solution_content, 20000),
+    (info.process_html_content.__wrapped__, legacy_process_html_content, 3000),
+])
+def test_matches_previous_implementation(new, old, count):
+    for text in random_texts(count, seed=16):
+        assert new(text) == old(text), repr(text)
+
+def test_long_text_is_truncated_like_before():
+    for text in random_texts(200, seed=17, max_atoms=600):
+        assert info.clean_text_for_telegram(text) == legacy_clean_text_for_telegram(text), repr(text)
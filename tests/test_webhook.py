@@ -0,0 +1,74 @@
+"""
+Webhook mode against a stand-in Telegram server: registration, the secret token check,
+malformed bodies and the polling fallback when Telegram refuses the webhook.
+"""
+import asyncio
+
+import aiohttp
+import pytest
+
+import info
+from bot_harness import start_webhook
+from fake_telegram import FakeBotApi, command_update
+
+USER_ID = info.AUTHORIZED_USER_IDS[0]
+
+@pytest.fixture(autouse=True)
+def no_render_workers(monkeypatch):
+    # No render workers are needed to answer commands
+    monkeypatch.setattr(info, "warm_render_pool", lambda: None)
+
+async def serving(configure):
+    """Starts serve_webhook against a fresh FakeBotApi; returns (api, stop_event, serve task)."""
+    api = await FakeBotApi().start()
+    configure(api)
+    stop, task = await start_webhook(api, info.build_application())
+    return api, stop, task
+
+def test_registers_webhook_and_answers_updates(configure):
+    async def scenario():
+        api, stop, task = await serving(configure)
+        try:
+            assert api.webhook["url"] == info.WEBHOOK_URL
+            assert api.webhook["secret"]
+            assert await api.post_update(command_update(1, USER_ID, "/start")) == 200
+            await api.wait_for(lambda: api.called("sendMessage"))
+            assert "Test Extraction and Info Bot" in api.called("sendMessage")[0]["text"]
+        finally:
+            stop.set()
+            assert await task is True
+            await api.close()
+    asyncio.run(scenario())
+
+def test_rejects_wrong_secret_and_malformed_bodies(configure):
+    async def scenario():
+        api, stop, task = await serving(configure)
+        try:
+            for secret in ("wrong", "", api.webhook["secret"][:-1]):
+                assert await api.post_update(command_update(1, USER_ID, "/start"), secret=secret) == 403, secret
+            for body in ([], [1], "update", {}, {"update_id": 2, "message": 5}):
+                assert await api.post_update(body) == 400, body
+            headers = {"X-Telegram-Bot-Api-Secret-Token": api.webhook["secret"]}
+            async with aiohttp.ClientSession() as session:
+                async with session.post(info.WEBHOOK_URL, data=b"{not json", headers=headers) as response:
+                    assert response.status == 400
+            await asyncio.sleep(0.2)
+            assert not api.called("sendMessage")
+        finally:
+            stop.set()
+            await task
+            await api.close()
+    asyncio.run(scenario())
+
+def test_refused_webhook_returns_false(configure, monkeypatch):
+    async def scenario():
+        api = await FakeBotApi().start()
+        configure(api)
+        # The stand-in, like Telegram, refuses plain-http URLs on public hosts
+        monkeypatch.setattr(info, "WEBHOOK_URL", "http://bot.example.com/telegram")
+        try:
+            assert await info.serve_webhook(info.build_application(), asyncio.Event()) is False
+            assert not api.webhook
+        finally:
+            await api.close()
+    asyncio.run(scenario())